@@ -1,9 +1,23 @@
+from concurrent.futures import Executor
 from dataclasses import dataclass
-from typing import List, Optional
-from bls import PublicKey, g2_eq
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from bls import COMPRESSED, G1Point, PublicKey, g2_eq
+from common import hex_str
+from instrumentation import span
 from keypair import KeyPair
-from srs import SerialisedSRS, SRS, SRSParameters
-from srs_updates import UpdateProof, UpdateProofs
+from srs import (OPTIMISTIC_VERIFICATION_STAGES, STAGE_DESERIALISE, STAGE_ENCODING, VERIFICATION_STAGES, SerialisedSRS, SRS, SRSParameters,
+                 StreamingUpdate, VerificationReport)
+from srs_updates import UpdateProof, UpdateProofIndex, UpdateProofs
+
+# The number of points that a StreamingContributor holds in memory at once
+DEFAULT_WINDOW_SIZE = 1024
+
+# The number of contributions that an optimistic Coordinator accepts before they should be audited
+DEFAULT_AUDIT_BATCH_SIZE = 8
+
+# Recorded in `Coordinator.last_report` when an audit rolled back the SRS that a contribution
+# was made on while the contribution was being checked
+ROLLED_BACK = "rolled back"
 
 
 # The Contributor/Participant has two roles:
@@ -13,28 +27,183 @@ from srs_updates import UpdateProof, UpdateProofs
 class Contributor:
     keypair: KeyPair
     srs: SRS
-    # The contributor keeps two SRS's in memory because they will
-    # do the subgroup checks on the SRS they received from the co-ordinator
-    # _after_ they have added their contribution.
+    # The SRS received from the co-ordinator, before it was updated
     old_srs: Optional[SRS]
 
-    def __init__(self, keypair: KeyPair, parameters: SRSParameters, serialised_srs: SerialisedSRS):
-        self.srs = SRS.deserialise(parameters, serialised_srs)
+    # `num_workers` is the number of processes used to decompress the SRS.
+    # If `executor` is given, it is used instead of starting a new pool, see `parallel.py`
+    def __init__(self, keypair: KeyPair, parameters: SRSParameters, serialised_srs: SerialisedSRS, num_workers: int = 1, executor: Optional[Executor] = None):
+        with span("contributor.deserialise"):
+            self.srs = SRS.deserialise(
+                parameters, serialised_srs, num_workers, executor)
         # Copy the old SRS because when we update the SRS, it overwrites it
         # We check the SRS after updating
-        self.old_srs = self.srs.copy()
+        # The copy shares the points with the SRS until they are updated, see `SRS.copy`
+        with span("contributor.copy"):
+            self.old_srs = self.srs.copy()
         self.keypair = keypair
 
-    def update_srs(self):
-        return self.srs.update(self.keypair)
+    # The SRS received is subgroup checked before it is updated. Multiplying points outside
+    # of the subgroup by the powers of the secret would leak the secret modulo the cofactor,
+    # and `bls.multiply_g1` is only correct for points in the subgroup.
+    # Raises a ValueError, without updating the SRS, if the checks fail.
+    def update_srs(self, num_workers: int = 1, executor: Optional[Executor] = None) -> UpdateProof:
+        if self.all_elements_in_correct_subgroup() == False:
+            raise ValueError("The received SRS is not in the correct subgroup")
+        with span("contributor.update"):
+            return self.srs.update(self.keypair, num_workers, executor)
 
     # Contributors do not check that the SRS is correctly formed
     # They only do subgroup checks
     def all_elements_in_correct_subgroup(self):
-        return self.old_srs.subgroup_checks()
+        with span("contributor.subgroup_checks"):
+            return self.old_srs.subgroup_checks()
 
     def serialise_srs(self):
-        return self.srs.serialise()
+        with span("contributor.serialise"):
+            return self.srs.serialise()
+
+
+# A Contributor that never holds the whole SRS in memory.
+#
+# Instead of deserialising the SRS, keeping a copy of it for the subgroup checks
+# and then serialising it, the StreamingContributor takes a window of compressed points at a time.
+# Each window is decompressed, subgroup checked, updated, compressed and then dropped.
+# The windows are processed lazily, so reading the next window from the network or a file
+# is interleaved with updating the previous one.
+@dataclass
+class StreamingContributor:
+    keypair: KeyPair
+    parameters: SRSParameters
+    g1_update: StreamingUpdate
+    g2_update: StreamingUpdate
+
+    def __init__(self, keypair: KeyPair, parameters: SRSParameters):
+        self.keypair = keypair
+        self.parameters = parameters
+        self.g1_update = StreamingUpdate(
+            keypair.private_key, subgroup_check=True)
+        self.g2_update = StreamingUpdate(
+            keypair.private_key, is_g2=True, subgroup_check=True)
+
+    def update_g1_windows(self, windows: Iterable[List[hex_str]]) -> Iterator[List[hex_str]]:
+        for window in windows:
+            yield self.g1_update.update(window)
+
+    def update_g2_windows(self, windows: Iterable[List[hex_str]]) -> Iterator[List[hex_str]]:
+        for window in windows:
+            yield self.g2_update.update(window)
+
+    # Updates a serialised SRS, `window_size` points at a time.
+    # Raises a ValueError, without updating the rest of the SRS, if a point is not in the correct subgroup
+    def update_serialised_srs(self, serialised_srs: SerialisedSRS, window_size: int = DEFAULT_WINDOW_SIZE) -> SerialisedSRS:
+        assert serialised_srs.num_g1_points == self.parameters.num_g1_points_needed
+        assert serialised_srs.num_g2_points == self.parameters.num_g2_points_needed
+        assert serialised_srs.encoding == COMPRESSED
+
+        g1_powers = []
+        for window in self.update_g1_windows(_windows(serialised_srs.g1_points, window_size)):
+            g1_powers.extend(window)
+        g2_powers = []
+        for window in self.update_g2_windows(_windows(serialised_srs.g2_points, window_size)):
+            g2_powers.extend(window)
+
+        return SerialisedSRS(self.parameters.num_g1_points_needed, self.parameters.num_g2_points_needed, g1_powers, g2_powers)
+
+    # Returns the update proof, once every point has been updated
+    def update_proof(self) -> UpdateProof:
+        assert self.g1_update.num_points == self.parameters.num_g1_points_needed
+        assert self.g2_update.num_points == self.parameters.num_g2_points_needed
+        return UpdateProof(self.keypair.public_key, self.g1_update.degree_1_point)
+
+    # The subgroup checks were done on the SRS that was received, as it was updated.
+    # This is False once an update has raised because of a point outside of the subgroup
+    def all_elements_in_correct_subgroup(self):
+        return self.g1_update.failing_index is None and self.g2_update.failing_index is None
+
+
+def _windows(powers: List[hex_str], window_size: int) -> Iterator[List[hex_str]]:
+    for start in range(0, len(powers), window_size):
+        yield powers[start: start + window_size]
+
+
+# A check that the coordinator needs to run, and the arguments to run it with.
+# `function(*arguments)` can be run in this process, see `run`, or on a worker process,
+# so that the coordinator is free to accept contributions while the check runs.
+# The result is handed back to the coordinator, which discards it if the coordinator
+# has rolled back an SRS since the job was created, see `Coordinator.num_rollbacks`.
+@dataclass
+class CoordinatorJob:
+    function: Callable
+    arguments: tuple
+    num_rollbacks: int
+
+    def run(self):
+        return self.function(*self.arguments)
+
+
+# Checks a contribution against the degree-1 point of the SRS that it was made on.
+# Returns the verification report and, if the SRS was accepted but is not in canonical form,
+# the SRS to hand to the next contributor instead.
+#
+# With the optimistic stages, the SRS is passed on without being re-serialised,
+# so it is rejected at the encoding stage if it is not already in canonical form.
+# Contributors that follow the specs always send a canonical SRS.
+def check_contribution(parameters: SRSParameters, before_degree_1_point: G1Point, serialised_srs: SerialisedSRS, update_proof: UpdateProof, stages: List[str], num_workers: int = 1, executor: Optional[Executor] = None) -> Tuple[VerificationReport, Optional[SerialisedSRS]]:
+    is_canonical = serialised_srs.is_canonical()
+    if STAGE_DESERIALISE not in stages and is_canonical == False:
+        return (VerificationReport(False, STAGE_ENCODING, []), None)
+
+    report = SRS.verify_updates_staged(
+        parameters, before_degree_1_point, serialised_srs, [update_proof], stages, num_workers, executor)
+    outgoing_srs = None
+    if report.passed and is_canonical == False:
+        outgoing_srs = report.srs.serialise()
+    return (report, outgoing_srs)
+
+
+@dataclass
+class AuditResult:
+    # The number of SRS's that were audited
+    num_audited: int
+    # The index, among the audited SRS's, of the first bad contribution, if any
+    bad_index: Optional[int]
+    # The deserialised form of the last good SRS that was audited, if any
+    srs: Optional[SRS]
+
+
+# Fully checks contributions that were accepted optimistically. The i'th SRS in `serialised_srs_list`
+# is checked against the degree-1 point of the last audited SRS and the first i + 1 update proofs.
+#
+# All of them are checked at once by checking the latest SRS. If it is not correct,
+# the first bad contribution is found by bisection.
+def audit_contributions(parameters: SRSParameters, audited_degree_1_point: G1Point, serialised_srs_list: List[SerialisedSRS], update_proofs: UpdateProofs, num_workers: int = 1, executor: Optional[Executor] = None) -> AuditResult:
+    # Returns the deserialised SRS if the checks pass, otherwise None
+    def check(i: int) -> Optional[SRS]:
+        report = SRS.verify_updates_staged(
+            parameters, audited_degree_1_point, serialised_srs_list[i], update_proofs[:i + 1], num_workers=num_workers, executor=executor)
+        return report.srs
+
+    num_audited = len(serialised_srs_list)
+    last = num_audited - 1
+    srs = check(last)
+    if srs is not None:
+        return AuditResult(num_audited, None, srs)
+
+    # We assume that once an SRS is bad, every SRS built on top of it is also bad.
+    # `bad` is always the index of a bad SRS and `good` the index of a good SRS, or -1
+    good = -1
+    good_srs = None
+    bad = last
+    while bad - good > 1:
+        middle = (good + bad) // 2
+        srs = check(middle)
+        if srs is None:
+            bad = middle
+        else:
+            good = middle
+            good_srs = srs
+    return AuditResult(num_audited, bad, good_srs)
 
 
 @dataclass
@@ -42,30 +211,166 @@ class Coordinator:
     # The co-ordinator only needs to save the current SRS
     # When a new SRS has been received, they will check it against the current
     # and then replace the current_SRS if the new SRS is valid
+    #
+    # In optimistic mode, a contribution is accepted after the cheap checks in
+    # `OPTIMISTIC_VERIFICATION_STAGES` and passed on without being deserialised.
+    # `current_SRS` is then the last SRS that passed the full checks, and the contributions
+    # accepted since are checked in a batch by `audit`.
+    #
+    # The checks are run as a `CoordinatorJob`. `replace_current_srs` and `audit` run them in
+    # this process. A caller that runs them elsewhere, such as `coordinator_service.CoordinatorService`,
+    # creates the job with `contribution_job` or `audit_job` and hands the result to
+    # `finish_contribution` or `finish_audit`. Contributions can be accepted while an audit runs.
     current_SRS: SRS
+    # The serialised form of the latest SRS, which is handed to each contributor
+    current_serialised_SRS: SerialisedSRS
+    parameters: SRSParameters
     update_proofs: List[UpdateProof]
+    # Finds the position of a public key in `update_proofs`
+    update_proof_index: UpdateProofIndex
+    # The number of processes used to decompress the SRS's received from contributors
+    num_workers: int
+    # A pool of worker processes that lives as long as the coordinator. If None, a pool
+    # of `num_workers` processes is started for each SRS that is decompressed
+    executor: Optional[Executor]
+    optimistic: bool
+    # The number of contributions accepted optimistically before `audit_due` returns True
+    audit_batch_size: int
+    # The contributions in `update_proofs` after this index have not been audited
+    num_audited: int
+    # The serialised SRS's that have not been audited, in the order they were accepted
+    unaudited_SRS: List[SerialisedSRS]
+    # The number of times that an audit rolled back to an earlier SRS
+    num_rollbacks: int
+    # Reports which stage rejected the last SRS received and how long each stage took
+    last_report: Optional[VerificationReport]
 
-    def __init__(self, srs: SRS):
+    def __init__(self, srs: SRS, num_workers: int = 1, optimistic: bool = False, audit_batch_size: int = DEFAULT_AUDIT_BATCH_SIZE, executor: Optional[Executor] = None):
         self.current_SRS = srs
+        self.current_serialised_SRS = srs.serialise()
+        self.parameters = SRSParameters(
+            srs.num_g1_points(), srs.num_g2_points())
         self.update_proofs = []
+        self.update_proof_index = UpdateProofIndex()
+        self.num_workers = num_workers
+        self.executor = executor
+        self.optimistic = optimistic
+        self.audit_batch_size = audit_batch_size
+        self.num_audited = 0
+        self.unaudited_SRS = []
+        self.num_rollbacks = 0
+        self.last_report = None
+        self.__audited_serialised_SRS = self.current_serialised_SRS
+        self.__audited_degree_1_point = srs.g1_points[1]
+        self.__degree_1_point = self.__audited_degree_1_point
 
     # Note: we don't need to return boolean indicating whether the coordinator accepted
     # the contributors contribution. The coordinator will simply move onto the next person in the queue
     def replace_current_srs(self, serialised_srs: SerialisedSRS, update_proof: UpdateProof):
+        with span("coordinator.replace_current_srs"):
+            job = self.contribution_job(serialised_srs, update_proof)
+            return self.finish_contribution(job, serialised_srs, update_proof, job.run())
 
-        parameters = SRSParameters(
-            self.current_SRS.num_g1_points(), self.current_SRS.num_g2_points())
+    # The cheap checks are made before the SRS is deserialised.
+    # In optimistic mode, only the cheap checks are made.
+    def contribution_job(self, serialised_srs: SerialisedSRS, update_proof: UpdateProof) -> CoordinatorJob:
+        stages = OPTIMISTIC_VERIFICATION_STAGES if self.optimistic else VERIFICATION_STAGES
+        arguments = (self.parameters, self.__degree_1_point, serialised_srs,
+                     update_proof, stages, self.num_workers, self.executor)
+        return CoordinatorJob(check_contribution, arguments, self.num_rollbacks)
 
-        received_srs = SRS.deserialise(parameters, serialised_srs)
-        if SRS.verify_updates(self.current_SRS, received_srs, [update_proof]) == False:
+    # Accepts the contribution if the result of `contribution_job` says that it passed.
+    # Returns True if it was accepted.
+    def finish_contribution(self, job: CoordinatorJob, serialised_srs: SerialisedSRS, update_proof: UpdateProof, result: Tuple[VerificationReport, Optional[SerialisedSRS]]) -> bool:
+        report, outgoing_srs = result
+        if job.num_rollbacks != self.num_rollbacks:
+            # The contribution was made on top of an SRS that has been dropped
+            report = VerificationReport(False, ROLLED_BACK, [])
+        self.last_report = report
+        if report.passed == False:
             return False
+
+        # The SRS we received is what we would have serialised, so we can send it on
+        # as it is. The lists are copied so that the contributor cannot change it afterwards.
+        if outgoing_srs is None:
+            outgoing_srs = serialised_srs.copy()
+        self.current_serialised_SRS = outgoing_srs
         self.update_proofs.append(update_proof)
-        self.current_SRS = received_srs
+        self.update_proof_index.append(update_proof)
+        self.__degree_1_point = update_proof.after_degree_1_point
+
+        if self.optimistic:
+            self.unaudited_SRS.append(outgoing_srs)
+        else:
+            self.current_SRS = report.srs
+            self.__audited_serialised_SRS = outgoing_srs
+            self.__audited_degree_1_point = self.__degree_1_point
+            self.num_audited = len(self.update_proofs)
 
         return True
 
+    # Returns True once enough contributions have been accepted optimistically to audit them
+    def audit_due(self) -> bool:
+        return len(self.unaudited_SRS) >= self.audit_batch_size
+
+    # Runs the full checks on the contributions that were accepted optimistically, see `audit_contributions`.
+    #
+    # If a contribution is bad, the coordinator rolls back to the last audited SRS, replays the
+    # contributions before the bad one and drops the bad contribution along with every contribution
+    # after it, since those were made on top of the bad SRS.
+    # Returns the index in `update_proofs` of the bad contribution, or None if there was none.
+    def audit(self) -> Optional[int]:
+        if len(self.unaudited_SRS) == 0:
+            return None
+        job = self.audit_job()
+        return self.finish_audit(job, job.run())
+
+    # Audits the contributions accepted so far. Contributions accepted while the job runs
+    # are left for the next audit, unless they were made on top of a bad contribution.
+    # Only one audit should be running at a time.
+    def audit_job(self) -> CoordinatorJob:
+        assert len(self.unaudited_SRS) > 0
+        update_proofs = self.update_proofs[self.num_audited:
+                                           self.num_audited + len(self.unaudited_SRS)]
+        arguments = (self.parameters, self.__audited_degree_1_point, list(self.unaudited_SRS),
+                     update_proofs, self.num_workers, self.executor)
+        return CoordinatorJob(audit_contributions, arguments, self.num_rollbacks)
+
+    # Applies the result of `audit_job`, see `audit`
+    def finish_audit(self, job: CoordinatorJob, result: AuditResult) -> Optional[int]:
+        # Only an audit rolls back, so nothing has been dropped since the job was created
+        assert job.num_rollbacks == self.num_rollbacks
+
+        if result.bad_index is None:
+            self.__mark_audited(result.num_audited - 1, result.srs)
+            return None
+
+        bad_index = self.num_audited + result.bad_index
+        # The bisection has already checked the contributions before the bad one
+        if result.srs is not None:
+            self.__mark_audited(result.bad_index - 1, result.srs)
+        del self.update_proofs[self.num_audited:]
+        self.update_proof_index.truncate(self.num_audited)
+        self.unaudited_SRS = []
+        self.current_serialised_SRS = self.__audited_serialised_SRS
+        self.__degree_1_point = self.__audited_degree_1_point
+        self.num_rollbacks += 1
+
+        return bad_index
+
+    # The i'th unaudited SRS becomes the last audited SRS, along with every contribution before it
+    def __mark_audited(self, i: int, srs: SRS):
+        self.current_SRS = srs
+        self.__audited_serialised_SRS = self.unaudited_SRS[i]
+        self.num_audited += i + 1
+        self.__audited_degree_1_point = self.update_proofs[self.num_audited -
+                                                           1].after_degree_1_point
+        self.unaudited_SRS = self.unaudited_SRS[i + 1:]
+
+    # Returns the serialised SRS without re-serialising it.
+    # The same object is handed to every contributor, so it should not be modified.
     def serialise_srs(self):
-        return self.current_SRS.serialise()
+        return self.current_serialised_SRS
 
 
 # A verifier has two roles,
@@ -80,18 +385,29 @@ class Verifier:
     # The list of contribution proofs that transitioned the `starting_srs`
     # to the `ending_srs`
     update_proofs: UpdateProofs
+    # Finds the position of a public key in `update_proofs`
+    update_proof_index: UpdateProofIndex
 
-    def __init__(self, param: SRSParameters, starting_srs: SerialisedSRS, ending_srs: SerialisedSRS, proofs: UpdateProofs):
+    # `num_workers` is the number of processes used to decompress the SRS's.
+    # If `executor` is given, it is used instead of starting a new pool for each SRS
+    def __init__(self, param: SRSParameters, starting_srs: SerialisedSRS, ending_srs: SerialisedSRS, proofs: UpdateProofs, num_workers: int = 1, executor: Optional[Executor] = None):
 
-        self.starting_srs = SRS.deserialise(param, starting_srs)
-        self.ending_srs = SRS.deserialise(param, ending_srs)
+        self.starting_srs = SRS.deserialise(
+            param, starting_srs, num_workers, executor)
+        self.ending_srs = SRS.deserialise(
+            param, ending_srs, num_workers, executor)
         self.update_proofs = proofs
+        self.update_proof_index = UpdateProofIndex(proofs)
 
     def verify_ceremony(self):
         return SRS.verify_updates(self.starting_srs, self.ending_srs, self.update_proofs)
 
     def find_contribution_no_verify(self, key: PublicKey) -> Optional[int]:
-        return Verifier.find_public_key_in_update_proofs(self.update_proofs, key)
+        return self.update_proof_index.find(key)
+
+    # Same as `find_contribution_no_verify` for many public keys at once
+    def find_contributions_no_verify(self, keys: List[PublicKey]) -> List[Optional[int]]:
+        return self.update_proof_index.find_many(keys)
 
     def find_public_key_in_update_proofs(update_proofs: UpdateProofs, key: PublicKey) -> Optional[int]:
         # Find the matching public key in the list of update proofs
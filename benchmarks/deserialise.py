@@ -0,0 +1,43 @@
+# Benchmarks how `SRS.deserialise` scales with the number of worker processes
+#
+# Run from the root of the repository:
+#   python -m benchmarks.deserialise --ceremony 1 --workers 1 2 4 8
+import argparse
+import os
+import time
+
+from srs import SRS
+from sdk import TRANSCRIPT_PARAMS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark SRS.deserialise with an increasing number of workers")
+    parser.add_argument("--ceremony", type=int, default=1, choices=range(1, len(TRANSCRIPT_PARAMS) + 1),
+                        help="which of the four ceremony sizes to deserialise")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, 8, 16, 32],
+                        help="worker counts to benchmark")
+    args = parser.parse_args()
+
+    params = TRANSCRIPT_PARAMS[args.ceremony - 1]
+    # Decompression costs the same for every point, so a fresh SRS is representative
+    serialised_srs = SRS(params).serialise()
+
+    print("Deserialising %d G1 + %d G2 points on %d cores" %
+          (params.num_g1_points_needed, params.num_g2_points_needed, os.cpu_count()))
+    print("%8s %10s %8s" % ("workers", "seconds", "speedup"))
+
+    serial_time = None
+    for num_workers in args.workers:
+        start = time.perf_counter()
+        SRS.deserialise(params, serialised_srs, num_workers)
+        elapsed = time.perf_counter() - start
+
+        if serial_time is None:
+            serial_time = elapsed
+        print("%8d %10.2f %8.2f" % (num_workers, elapsed, serial_time / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Measures the memory held by the points of an SRS, as a list of py_ecc tuples
+# and as the packed containers in `points.py`, using tracemalloc.
+#
+# Run from the root of the repository:
+#   python -m benchmarks.memory --ceremonies 1 2 3 4
+import argparse
+import tracemalloc
+
+from keypair import KeyPair
+from points import G1Points, G2Points
+from sdk import TRANSCRIPT_PARAMS
+from srs import SRS
+
+
+# Returns the number of bytes still allocated by `build` once it has returned, and its result
+def allocated_by(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the memory held by the points of an SRS")
+    parser.add_argument("--ceremonies", type=int, nargs="+", default=[1, 2, 3, 4], choices=range(1, len(TRANSCRIPT_PARAMS) + 1),
+                        help="which of the four ceremony sizes to measure")
+    args = parser.parse_args()
+
+    print("%8s %14s %14s %8s %14s" %
+          ("g1", "tuples", "packed", "ratio", "SRS.copy"))
+
+    for ceremony in args.ceremonies:
+        params = TRANSCRIPT_PARAMS[ceremony - 1]
+        # Updating once makes every point a distinct object, as in a received SRS
+        srs = SRS(params)
+        srs.update(KeyPair(ceremony + 1))
+
+        tuples_size, _ = allocated_by(
+            lambda: (list(srs.g1_points), list(srs.g2_points)))
+        packed_size, _ = allocated_by(
+            lambda: (G1Points(srs.g1_points), G2Points(srs.g2_points)))
+        copy_size, _ = allocated_by(lambda: srs.copy())
+
+        print("%8d %13.2fM %13.2fM %7.1fx %13.2fM" % (params.num_g1_points_needed, tuples_size / 2**20,
+              packed_size / 2**20, tuples_size / packed_size, copy_size / 2**20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Benchmarks the size and the (de)serialisation time of the SRS
+# with compressed and uncompressed points
+#
+# Run from the root of the repository:
+#   python -m benchmarks.point_encoding --ceremonies 1 2 3 4
+import argparse
+import time
+
+from bls import COMPRESSED, UNCOMPRESSED
+from keypair import KeyPair
+from srs import SRS
+from sdk import TRANSCRIPT_PARAMS
+
+
+# The size of the serialised points in bytes, as hex strings in the JSON transcript
+# and as raw bytes, such as in `binary_transcript`
+def serialised_sizes(serialised_srs):
+    powers = serialised_srs.g1_points + serialised_srs.g2_points
+    hex_size = sum(len(power) for power in powers)
+    return (hex_size, (hex_size - 2 * len(powers)) // 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark compressed and uncompressed SRS encodings")
+    parser.add_argument("--ceremonies", type=int, nargs="+", default=[1, 2, 3, 4], choices=range(1, len(TRANSCRIPT_PARAMS) + 1),
+                        help="which of the four ceremony sizes to benchmark")
+    args = parser.parse_args()
+
+    print("%8s %13s %12s %12s %12s %12s" % ("g1", "encoding",
+          "hex bytes", "raw bytes", "serialise", "deserialise"))
+
+    for ceremony in args.ceremonies:
+        params = TRANSCRIPT_PARAMS[ceremony - 1]
+        # Decompression costs about the same for every point, but updating
+        # once avoids every point being the generator
+        srs = SRS(params)
+        srs.update(KeyPair(ceremony + 1))
+
+        for encoding in [COMPRESSED, UNCOMPRESSED]:
+            start = time.perf_counter()
+            serialised_srs = srs.serialise(encoding)
+            serialise_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            SRS.deserialise(params, serialised_srs)
+            deserialise_time = time.perf_counter() - start
+
+            hex_size, raw_size = serialised_sizes(serialised_srs)
+            print("%8d %13s %12d %12d %11.2fs %11.2fs" % (params.num_g1_points_needed,
+                  encoding, hex_size, raw_size, serialise_time, deserialise_time))
+
+
+if __name__ == "__main__":
+    main()
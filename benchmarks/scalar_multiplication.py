@@ -0,0 +1,79 @@
+# Micro-benchmarks for the scalar multiplication engines in `bls.py`
+#
+# Each engine multiplies a sample of random points by random scalars, and the
+# cost per multiplication is used to project the cost of updating an SRS of each size.
+#
+# Run from the root of the repository:
+#   python -m benchmarks.scalar_multiplication --samples 20
+import argparse
+import random
+import time
+
+from py_ecc.optimized_bls12_381 import multiply
+
+from bls import G1Generator, G2Generator, curve_order, multiply_g1_glv, multiply_wnaf
+from sdk import TRANSCRIPT_PARAMS
+
+
+def time_per_call(function, inputs):
+    start = time.perf_counter()
+    for point, scalar in inputs:
+        function(point, scalar)
+    return (time.perf_counter() - start) / len(inputs)
+
+
+def random_inputs(generator, num_samples):
+    inputs = []
+    for _ in range(num_samples):
+        point = multiply(generator, random.randrange(1, curve_order))
+        inputs.append((point, random.randrange(curve_order)))
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scalar multiplication engines at each SRS size")
+    parser.add_argument("--samples", type=int, default=20,
+                        help="number of multiplications to time for each engine")
+    parser.add_argument("--windows", type=int, nargs="+", default=[3, 4, 5, 6],
+                        help="wNAF window sizes to benchmark")
+    args = parser.parse_args()
+
+    g1_inputs = random_inputs(G1Generator, args.samples)
+    g2_inputs = random_inputs(G2Generator, args.samples)
+
+    g1_engines = {"double-and-add": multiply}
+    g2_engines = {"double-and-add": multiply}
+    for window_size in args.windows:
+        g1_engines["wnaf-%d" % window_size] = lambda p, k, w=window_size: multiply_wnaf(p, k, w)
+        g1_engines["glv-wnaf-%d" % window_size] = lambda p, k, w=window_size: multiply_g1_glv(p, k, w)
+        g2_engines["wnaf-%d" % window_size] = lambda p, k, w=window_size: multiply_wnaf(p, k, w)
+
+    g1_costs = {name: time_per_call(engine, g1_inputs) for name, engine in g1_engines.items()}
+    g2_costs = {name: time_per_call(engine, g2_inputs) for name, engine in g2_engines.items()}
+
+    print("%-16s %12s" % ("G1 engine", "ms/mul"))
+    for name, cost in g1_costs.items():
+        print("%-16s %12.3f" % (name, cost * 1000))
+    print()
+    print("%-16s %12s" % ("G2 engine", "ms/mul"))
+    for name, cost in g2_costs.items():
+        print("%-16s %12.3f" % (name, cost * 1000))
+    print()
+
+    # Projected time to multiply every point of an SRS once, as in `SRS.update`
+    baseline = g1_costs["double-and-add"], g2_costs["double-and-add"]
+    best_g1 = min(g1_costs, key=g1_costs.get)
+    best_g2 = min(g2_costs, key=g2_costs.get)
+    print("Projected SRS.update time (double-and-add vs %s / %s)" % (best_g1, best_g2))
+    for params in TRANSCRIPT_PARAMS:
+        num_g1 = params.num_g1_points_needed
+        num_g2 = params.num_g2_points_needed
+        before = num_g1 * baseline[0] + num_g2 * baseline[1]
+        after = num_g1 * g1_costs[best_g1] + num_g2 * g2_costs[best_g2]
+        print("  %6d G1 + %2d G2: %8.1fs -> %8.1fs (%.2fx)" %
+              (num_g1, num_g2, before, after, before / after))
+
+
+if __name__ == "__main__":
+    main()
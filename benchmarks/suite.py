@@ -0,0 +1,175 @@
+# Times the main operations of the ceremony at each SRS size and writes the results as JSON.
+# A run can be compared against the results of a previous run to catch regressions.
+#
+# Run from the root of the repository:
+#   python -m benchmarks.suite --output results.json
+#   python -m benchmarks.suite --quick --baseline results.json
+#
+# `--quick` divides the number of points in each SRS by `QUICK_SCALE`,
+# which is enough to catch regressions in a few minutes.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from math import inf
+
+from bls import G1Generator, PrivateKey, multiply_g1
+from keypair import KeyPair
+from product_decomposition import ProductDecompositionProof
+from sdk import TRANSCRIPT_PARAMS, Transcript, update_transcript, verify_ceremonies
+from srs import SRS, SRSParameters
+
+QUICK_SCALE = 64
+
+# A benchmark is flagged as a regression if it is this much slower than the baseline,
+# and at least `MIN_REGRESSION_SECONDS` slower so that the fastest benchmarks do not flag noise
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+MIN_REGRESSION_SECONDS = 0.05
+
+# The number of links in the product decomposition proofs that are verified
+DEFAULT_NUM_PROOFS = 8
+
+
+# Runs `setup` then times `function` on its result, `repeat` times.
+# Returns the fastest time in seconds.
+def measure(function, setup, repeat: int) -> float:
+    best = inf
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def record(results: dict, name: str, seconds: float):
+    results[name] = seconds
+    print("%-44s %10.3fs" % (name, seconds), flush=True)
+
+
+def benchmark_params(quick: bool):
+    if quick == False:
+        return TRANSCRIPT_PARAMS
+    return [SRSParameters(params.num_g1_points_needed // QUICK_SCALE, max(2, params.num_g2_points_needed // QUICK_SCALE))
+            for params in TRANSCRIPT_PARAMS]
+
+
+def benchmark_srs(params: SRSParameters, repeat: int, results: dict):
+    size = "[%dx%d]" % (params.num_g1_points_needed,
+                        params.num_g2_points_needed)
+
+    srs = SRS(params)
+    srs.update(KeyPair(0x1234))
+    serialised_srs = srs.serialise()
+
+    # A fresh SRS holds the generators, which are multiplied with the fixed-base tables.
+    # A contributor receives an SRS that has already been updated, so that is what is measured
+    record(results, "SRS.update" + size, measure(lambda srs, keypair: srs.update(keypair),
+                                                 lambda: (srs.copy(), KeyPair(0x5678)), repeat))
+
+    benchmarks = [
+        ("SRS.serialise", lambda: srs.serialise()),
+        ("SRS.deserialise", lambda: SRS.deserialise(params, serialised_srs)),
+        ("SRS.subgroup_checks", lambda: srs.subgroup_checks()),
+        ("SRS.structure_check", lambda: srs.structure_check()),
+    ]
+    for name, function in benchmarks:
+        record(results, name + size, measure(function, lambda: (), repeat))
+
+
+def benchmark_product_decomposition(num_proofs: int, repeat: int, results: dict):
+    product_proof = ProductDecompositionProof(G1Generator)
+    for i in range(num_proofs):
+        secret = PrivateKey(0x1234 + i)
+        product_proof.extend(multiply_g1(product_proof.current_product(), secret),
+                             secret.to_public_key().point)
+
+    size = "[%d]" % num_proofs
+    for name, function in [("ProductDecompositionProof.verify", product_proof.verify),
+                           ("ProductDecompositionProof.verify_batched", product_proof.verify_batched)]:
+        record(results, name + size, measure(function, lambda: (), repeat))
+
+
+def benchmark_transcript(params: list, repeat: int, results: dict):
+    starting_transcript = Transcript([SRS(param).serialise() for param in params])
+    secrets = ["0x%x" % (0x1234 + i) for i in range(len(params))]
+
+    record(results, "sdk.update_transcript", measure(lambda: update_transcript(
+        starting_transcript, secrets, params=params), lambda: (), repeat))
+
+    ending_transcript, update_proofs = update_transcript(
+        starting_transcript, secrets, params=params)
+    ceremonies_update_proofs = [[proof] for proof in update_proofs]
+
+    record(results, "sdk.verify_ceremonies", measure(lambda: verify_ceremonies(
+        starting_transcript, ending_transcript, ceremonies_update_proofs), lambda: (), repeat))
+
+
+# Prints how each benchmark compares to the baseline.
+# Returns the names of the benchmarks that regressed.
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    print()
+    print("%-44s %10s %10s %8s" % ("benchmark", "baseline", "current", "ratio"))
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        flag = ""
+        if ratio > 1 + threshold and seconds - baseline[name] > MIN_REGRESSION_SECONDS:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print("%-44s %9.3fs %9.3fs %8.2f%s" %
+              (name, baseline[name], seconds, ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the ceremony operations at each SRS size")
+    parser.add_argument("--quick", action="store_true",
+                        help="divide the size of each SRS by %d" % QUICK_SCALE)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="number of times to run each benchmark, the fastest run is kept")
+    parser.add_argument("--proofs", type=int, default=DEFAULT_NUM_PROOFS,
+                        help="number of links in the product decomposition proof")
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    parser.add_argument("--baseline",
+                        help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="fraction slower than the baseline that is flagged as a regression")
+    args = parser.parse_args()
+
+    params = benchmark_params(args.quick)
+    results = {}
+    for param in params:
+        benchmark_srs(param, args.repeat, results)
+    benchmark_product_decomposition(args.proofs, args.repeat, results)
+    benchmark_transcript(params, args.repeat, results)
+
+    report = {
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["quick"] != args.quick:
+            print("warning: comparing a %s run against a %s baseline" %
+                  ("quick" if args.quick else "full", "quick" if baseline["quick"] else "full"))
+        regressions = compare(results, baseline["results"], args.threshold)
+        if len(regressions) > 0:
+            print("\n%d benchmarks regressed" % len(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
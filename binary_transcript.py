@@ -0,0 +1,145 @@
+import mmap
+import struct
+from typing import BinaryIO, List
+
+from bls import COMPRESSED
+from common import bytes_from_hex, bytes_to_hex
+from sdk import Transcript
+from srs import SerialisedSRS, SRSParameters
+
+# A fixed-layout binary encoding of a transcript.
+#
+# The header is:
+#   - magic: 4 bytes
+#   - version: u32
+#   - number of sub-ceremonies: u32
+#   - for each sub-ceremony, the number of G1 points and G2 points: u32, u32
+# Integers are little-endian.
+#
+# After the header, each sub-ceremony is laid out in order as its compressed
+# G1 points followed by its compressed G2 points, with no padding.
+# Since every point has a fixed size, the offset of any point is known from the header alone.
+MAGIC = b"KZGT"
+VERSION = 1
+
+G1_POINT_SIZE = 48
+G2_POINT_SIZE = 96
+
+_HEADER_PREFIX = struct.Struct("<4sII")
+_CEREMONY_HEADER = struct.Struct("<II")
+
+
+def _header_size(num_ceremonies: int) -> int:
+    return _HEADER_PREFIX.size + num_ceremonies * _CEREMONY_HEADER.size
+
+
+def write_binary_transcript(transcript: Transcript, file: BinaryIO):
+    ceremonies = transcript.sub_ceremonies
+
+    file.write(_HEADER_PREFIX.pack(MAGIC, VERSION, len(ceremonies)))
+    for ceremony in ceremonies:
+        file.write(_CEREMONY_HEADER.pack(
+            ceremony.num_g1_points, ceremony.num_g2_points))
+
+    for ceremony in ceremonies:
+        # The binary format only stores compressed points
+        assert ceremony.encoding == COMPRESSED
+        assert len(ceremony.g1_points) == ceremony.num_g1_points
+        assert len(ceremony.g2_points) == ceremony.num_g2_points
+
+        for point in ceremony.g1_points:
+            serialised_point = bytes_from_hex(point)
+            assert len(serialised_point) == G1_POINT_SIZE
+            file.write(serialised_point)
+        for point in ceremony.g2_points:
+            serialised_point = bytes_from_hex(point)
+            assert len(serialised_point) == G2_POINT_SIZE
+            file.write(serialised_point)
+
+
+# Reads a binary transcript by memory mapping the file.
+#
+# The compressed points of each sub-ceremony are handed out as memoryview slices
+# of the mapped file, so no copy is made and no python objects are created per point.
+# The memoryviews must be released before the transcript is closed.
+class BinaryTranscript:
+    parameters: List[SRSParameters]
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.__mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__view = memoryview(self.__mmap)
+
+        if len(self.__view) < _HEADER_PREFIX.size:
+            self.close()
+            raise ValueError("binary transcript is too short")
+        magic, version, num_ceremonies = _HEADER_PREFIX.unpack_from(
+            self.__view, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("file is not a binary transcript")
+        if version != VERSION:
+            self.close()
+            raise ValueError(
+                "unsupported binary transcript version %d" % version)
+
+        if len(self.__view) < _header_size(num_ceremonies):
+            self.close()
+            raise ValueError("binary transcript is too short")
+
+        self.parameters = []
+        self.__offsets = []
+        offset = _header_size(num_ceremonies)
+        for i in range(num_ceremonies):
+            num_g1_points, num_g2_points = _CEREMONY_HEADER.unpack_from(
+                self.__view, _HEADER_PREFIX.size + i * _CEREMONY_HEADER.size)
+            self.parameters.append(SRSParameters(num_g1_points, num_g2_points))
+            self.__offsets.append(offset)
+            offset += num_g1_points * G1_POINT_SIZE + num_g2_points * G2_POINT_SIZE
+
+        if offset != len(self.__view):
+            self.close()
+            raise ValueError("binary transcript has the wrong size")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.__view.release()
+        self.__mmap.close()
+
+    def num_ceremonies(self) -> int:
+        return len(self.parameters)
+
+    # Returns the compressed G1 points of a sub-ceremony, back to back
+    def g1_points(self, ceremony: int) -> memoryview:
+        start = self.__offsets[ceremony]
+        end = start + self.parameters[ceremony].num_g1_points_needed * G1_POINT_SIZE
+        return self.__view[start:end]
+
+    # Returns the compressed G2 points of a sub-ceremony, back to back
+    def g2_points(self, ceremony: int) -> memoryview:
+        start = self.__offsets[ceremony] + \
+            self.parameters[ceremony].num_g1_points_needed * G1_POINT_SIZE
+        end = start + self.parameters[ceremony].num_g2_points_needed * G2_POINT_SIZE
+        return self.__view[start:end]
+
+    # Converts a sub-ceremony to the hex string format
+    def serialised_srs(self, ceremony: int) -> SerialisedSRS:
+        g1_points = self.g1_points(ceremony)
+        g2_points = self.g2_points(ceremony)
+
+        g1_powers = [bytes_to_hex(g1_points[i: i + G1_POINT_SIZE])
+                     for i in range(0, len(g1_points), G1_POINT_SIZE)]
+        g2_powers = [bytes_to_hex(g2_points[i: i + G2_POINT_SIZE])
+                     for i in range(0, len(g2_points), G2_POINT_SIZE)]
+
+        params = self.parameters[ceremony]
+        return SerialisedSRS(params.num_g1_points_needed, params.num_g2_points_needed, g1_powers, g2_powers)
+
+    # Converts the whole transcript to the hex string format
+    def to_transcript(self) -> Transcript:
+        return Transcript([self.serialised_srs(i) for i in range(self.num_ceremonies())])
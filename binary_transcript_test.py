@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from binary_transcript import BinaryTranscript, write_binary_transcript
+from keypair import KeyPair
+from sdk import Transcript
+from srs import SRS, SRSParameters
+
+
+class TestBinaryTranscript(unittest.TestCase):
+
+    def test_binary_transcript_roundtrip(self):
+        """
+            Checks that converting a transcript to the binary format
+            and back gives the same transcript, and that the memory mapped
+            points deserialise to the same SRS
+        """
+        params = [SRSParameters(4, 2), SRSParameters(3, 2)]
+        sub_ceremonies = []
+        for i, param in enumerate(params):
+            srs = SRS(param)
+            srs.update(KeyPair(i + 2))
+            sub_ceremonies.append(srs.serialise())
+        transcript = Transcript(sub_ceremonies)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "transcript.bin")
+            with open(path, "wb") as file:
+                write_binary_transcript(transcript, file)
+
+            with BinaryTranscript(path) as binary_transcript:
+                self.assertEqual(binary_transcript.parameters, params)
+                self.assertEqual(binary_transcript.to_transcript(), transcript)
+
+                for i, param in enumerate(params):
+                    srs = SRS.from_compressed_bytes(param, binary_transcript.g1_points(
+                        i), binary_transcript.g2_points(i))
+                    self.assertEqual(srs.serialise(), sub_ceremonies[i])
+
+    def test_truncated_binary_transcript(self):
+        """
+            Checks that a file cut short inside the header is rejected with a ValueError
+        """
+        param = SRSParameters(4, 2)
+        transcript = Transcript([SRS(param).serialise()])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "transcript.bin")
+            with open(path, "wb") as file:
+                write_binary_transcript(transcript, file)
+            with open(path, "rb") as file:
+                byts = file.read()
+
+            # Inside the fixed part of the header, then inside the sizes of the sub-ceremonies
+            for length in [3, len(byts) - param.num_g1_points_needed * 48 - param.num_g2_points_needed * 96 - 1]:
+                with open(path, "wb") as file:
+                    file.write(byts[:length])
+                with self.assertRaises(ValueError):
+                    BinaryTranscript(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,21 @@
 # been declared later on in the python file
 from __future__ import annotations
 
+import hashlib
+import os
 from dataclasses import dataclass
-from typing import Optional, Tuple, Union
+from math import inf
+from secrets import randbits
+from typing import List, Optional, Tuple, Union
 from py_ecc.optimized_bls12_381 import (
-    G1 as G1Generator, G2 as G2Generator, FQ, FQ2, FQ12, curve_order, multiply, is_inf, is_on_curve, optimized_pairing, eq, b, b2)
-from py_ecc.bls.g2_primatives import (G1_to_pubkey as compressed_g1_to_bytes,
-                                      pubkey_to_G1 as compressed_bytes_to_g1, G2_to_signature as compressed_g2_to_bytes, signature_to_G2 as compressed_bytes_to_g2)
+    G1 as G1Generator, G2 as G2Generator, FQ, FQ2, FQ12, curve_order, add, double, multiply, neg, is_inf, is_on_curve, optimized_pairing, eq, b, b2)
+from py_ecc.optimized_bls12_381 import field_modulus, normalize, twist
+from py_ecc.bls.constants import POW_2_381, POW_2_382, POW_2_383
+from py_ecc.bls.point_compression import decompress_G1, decompress_G2
+from py_ecc.bls.hash import os2ip
 from common import bytes_from_hex, bytes_to_hex, hex_str
+from instrumentation import (BATCH_SUBGROUP_CHECK_POINTS, FINAL_EXPONENTIATIONS, G1_DECOMPRESSIONS, G1_SCALAR_MULTIPLICATIONS, G2_DECOMPRESSIONS,
+                             G2_SCALAR_MULTIPLICATIONS, MULTI_SCALAR_MULTIPLICATION_POINTS, PAIRINGS, SUBGROUP_CHECKS, count)
 
 # Types are aliased and specialised from py_ecc
 # so that the methods work as expected
@@ -21,31 +29,221 @@ GT = FQ12
 # Re-exports
 G1Generator = G1Generator
 G2Generator = G2Generator
-#
-compressed_bytes_to_g1 = compressed_bytes_to_g1
-compressed_g1_to_bytes = compressed_g1_to_bytes
-compressed_bytes_to_g2 = compressed_bytes_to_g2
-compressed_g2_to_bytes = compressed_g2_to_bytes
+
+# The parameter that BLS12-381 is generated from. It is negative.
+BLS_X = -0xd201000000010000
+
+# A non-trivial cube root of unity in FQ.
+# The endomorphism (x, y) -> (beta * x, y) acts on G1 as multiplication by -x^2
+G1_ENDOMORPHISM_BETA = FQ(
+    0x5f19672fdf76ce51ba69c6076a0f77eaddb3a93be6f89688de17d813620a00022e01fffffffefffe)
+
+# Coefficients for the untwist-Frobenius-twist endomorphism psi.
+# (x, y) -> (conj(x) * coeff_x, conj(y) * coeff_y) acts on G2 as multiplication by x.
+# Where coeff_x = 1 / (1 + u)^((p-1)/3) and coeff_y = 1 / (1 + u)^((p-1)/2)
+G2_PSI_COEFF_X = FQ2((
+    0,
+    0x1a0111ea397fe699ec02408663d4de85aa0d857d89759ad4897d29650fb85f9b409427eb4f49fffd8bfd00000000aaad))
+G2_PSI_COEFF_Y = FQ2((
+    0x135203e60180a68ee2e9c448d77a2cd91c3dedd930b1cf60ef396489f61eb45e304466cf3e67fa0af1ee7b04121bdea2,
+    0x06af0e0437ff400b6831e36d6bd17ffe48395dabc2d3435e77f76e17009241c5ee67992f72ec05f4c81084fbede3cc09))
 
 
 def is_identity(point: G1Point) -> bool:
     return is_inf(point)
 
 
+def is_normalized(point: Union[G1Point, G2Point]) -> bool:
+    return point[2] == point[2].one()
+
+
 def g1_eq(lhs: G1Point, rhs: G1Point):
+    # Normalised points can be compared without any multiplications
+    if is_normalized(lhs) and is_normalized(rhs):
+        return lhs[0] == rhs[0] and lhs[1] == rhs[1]
     return eq(lhs, rhs)
 
 
 def g2_eq(lhs: G2Point, rhs: G2Point):
+    # Normalised points can be compared without any multiplications
+    if is_normalized(lhs) and is_normalized(rhs):
+        return lhs[0] == rhs[0] and lhs[1] == rhs[1]
     return eq(lhs, rhs)
 
 
+# Converts projective points (x, y, z) into the normalised form (x/z, y/z, 1).
+# Montgomery's trick is used, so that only a single field inversion is needed for the whole list.
+# The identity point is left as is.
+def batch_normalize(points: List[Union[G1Point, G2Point]]) -> List[Union[G1Point, G2Point]]:
+    indices = [i for i, point in enumerate(points)
+               if is_identity(point) == False]
+    normalized = list(points)
+    if len(indices) == 0:
+        return normalized
+
+    # prefix_products[j] is the product of the z coordinates of the first j+1 points
+    prefix_products = [points[indices[0]][2]]
+    for i in indices[1:]:
+        prefix_products.append(prefix_products[-1] * points[i][2])
+
+    # Walking backwards, `inverse` is the inverse of prefix_products[j]
+    inverse = prefix_products[-1].one() / prefix_products[-1]
+    for j in reversed(range(len(indices))):
+        x, y, z = points[indices[j]]
+        if j > 0:
+            z_inverse = inverse * prefix_products[j - 1]
+        else:
+            z_inverse = inverse
+        inverse = inverse * z
+        normalized[indices[j]] = (x * z_inverse, y * z_inverse, z.one())
+
+    return normalized
+
+
+# Normalises a single point with one field inversion.
+# Unlike `batch_normalize`, this does not build the prefix products, which only pay off for several points.
+def normalize_point(point: Union[G1Point, G2Point]) -> Union[G1Point, G2Point]:
+    if is_identity(point):
+        return point
+    # `normalize` from py_ecc divides by z twice, so the inverse is computed here once
+    x, y, z = point
+    z_inverse = z.one() / z
+    return (x * z_inverse, y * z_inverse, z.one())
+
+
 def gt_eq(lhs: FQ12, rhs: FQ12):
     return lhs == rhs
 
 
+def neg_g1(point: G1Point) -> G1Point:
+    return neg(point)
+
+
 def pairing(g1: G1Point, g2: G2Point):
-    return optimized_pairing.pairing(g2, g1)
+    return multi_pairing([(g1, g2)])
+
+
+# Computes the product of the pairings of each (G1, G2) pair.
+# The Miller loop outputs are multiplied together so that
+# only a single final exponentiation is needed.
+#
+# A G2 point that is used in many pairings can be passed as a `PreparedG2`
+def multi_pairing(pairs: List[Tuple[G1Point, Union[G2Point, PreparedG2]]]) -> GT:
+    product = FQ12.one()
+    for g1, g2 in pairs:
+        assert is_in_g1(g1)
+        if isinstance(g2, PreparedG2):
+            if is_identity(g1) or g2.is_identity:
+                continue
+            count(PAIRINGS)
+            product = product * g2.miller_loop(g1)
+            continue
+
+        assert is_in_g2(g2)
+        # The pairing with the identity point is the identity in GT
+        if is_identity(g1) or is_identity(g2):
+            continue
+        count(PAIRINGS)
+        product = product * optimized_pairing.miller_loop(
+            g2, g1, final_exponentiate=False)
+    count(FINAL_EXPONENTIATIONS)
+    return optimized_pairing.final_exponentiate(product)
+
+
+# Checks that the product of the pairings of each (G1, G2) pair is the identity.
+# To check that e(a, b) == e(c, d), one negates a side and checks that
+# e(a, b) * e(-c, d) == 1
+def pairing_check(pairs: List[Tuple[G1Point, Union[G2Point, PreparedG2]]]) -> bool:
+    return gt_eq(multi_pairing(pairs), FQ12.one())
+
+
+# A G2 point with the line functions of its Miller loop computed ahead of time.
+#
+# The line function evaluated at a G1 point (x, y, z) has the form
+#   (A * x - B * y + C * z) / (D * z)
+# where A, B, C and D only depend on the G2 point. We store A, B and C for every step
+# of the loop. The G1 point is normalised so that z = 1, which means that the product
+# of the denominators is the same for every G1 point and can be inverted once.
+#
+# The Miller loop for a G1 point then only multiplies A, B and C by integers and
+# accumulates the result, without doing any G2 arithmetic.
+# This gives the same pairing as py_ecc, once the final exponentiation is applied.
+class PreparedG2:
+    def __init__(self, point: G2Point):
+        assert is_in_g2(point)
+        self.point = point
+        self.is_identity = is_identity(point)
+        # (is_doubling_step, A, B, C) for each step of the loop
+        self.lines: List[Tuple[bool, FQ12, FQ12, FQ12]] = []
+        self.inverse_denominator = FQ12.one()
+        if self.is_identity:
+            return
+
+        # This follows `optimized_pairing.miller_loop`
+        denominator = FQ12.one()
+        R = point
+        twist_R = twist_Q = twist(point)
+        for bit in optimized_pairing.pseudo_binary_encoding[62::-1]:
+            A, B, C, D = _line_coefficients(twist_R, twist_R)
+            self.lines.append((True, A, B, C))
+            denominator = denominator * denominator * D
+            R = double(R)
+            twist_R = twist(R)
+            if bit == 1:
+                A, B, C, D = _line_coefficients(twist_R, twist_Q)
+                self.lines.append((False, A, B, C))
+                denominator = denominator * D
+                R = add(R, point)
+                twist_R = twist(R)
+        self.inverse_denominator = FQ12.one() / denominator
+
+    # The Miller loop of the pairing with `g1`, without the final exponentiation
+    def miller_loop(self, g1: G1Point) -> FQ12:
+        if self.is_identity or is_identity(g1):
+            return FQ12.one()
+
+        x, y = normalize(g1)
+        x = x.n
+        y = y.n
+        f = FQ12.one()
+        for (is_doubling_step, A, B, C) in self.lines:
+            line = A * x - B * y + C
+            if is_doubling_step:
+                f = f * f * line
+            else:
+                f = f * line
+        return f * self.inverse_denominator
+
+
+# Returns (A, B, C, D) for the line through the twisted points p1 and p2, see `PreparedG2`
+# This mirrors `optimized_pairing.linefunc`
+def _line_coefficients(p1, p2) -> Tuple[FQ12, FQ12, FQ12, FQ12]:
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    zero = x1.zero()
+    m_numerator = y2 * z1 - y1 * z2
+    m_denominator = x2 * z1 - x1 * z2
+    if m_denominator == zero:
+        if m_numerator != zero:
+            # The vertical line through p1
+            return (z1, zero, -x1, z1)
+        # The tangent at p1
+        m_numerator = 3 * x1 * x1
+        m_denominator = 2 * y1 * z1
+
+    # m_numerator * (x * z1 - x1 * z) - m_denominator * (y * z1 - y1 * z)
+    return (m_numerator * z1, m_denominator * z1, m_denominator * y1 - m_numerator * x1, m_denominator * z1)
+
+
+_prepared_g2_generator = None
+
+
+# Returns the G2 generator as a `PreparedG2`. It is prepared the first time it is needed.
+def prepared_g2_generator() -> PreparedG2:
+    global _prepared_g2_generator
+    if _prepared_g2_generator is None:
+        _prepared_g2_generator = PreparedG2(G2Generator)
+    return _prepared_g2_generator
 
 
 def is_in_g1(point: G1Point):
@@ -57,21 +255,737 @@ def is_in_g2(point: G2Point):
 
 
 # slow way to check if a point is in the subgroup
-def is_in_subgroup(point: Union[G1Point, G2Point]):
+# This is kept as a reference to cross-check the fast subgroup checks against
+def is_in_subgroup_slow(point: Union[G1Point, G2Point]):
     return is_identity(multiply(point, curve_order))
 
 
+def g1_endomorphism(point: G1Point) -> G1Point:
+    x, y, z = point
+    return (x * G1_ENDOMORPHISM_BETA, y, z)
+
+
+def g2_psi(point: G2Point) -> G2Point:
+    x, y, z = point
+    return (_fq2_conjugate(x) * G2_PSI_COEFF_X, _fq2_conjugate(y) * G2_PSI_COEFF_Y, _fq2_conjugate(z))
+
+
+def _fq2_conjugate(element: FQ2) -> FQ2:
+    re, im = element.coeffs
+    return FQ2((re, -im))
+
+
+# A point on the curve is in G1 if and only if endomorphism(P) == -x^2 * P
+# See: https://eprint.iacr.org/2021/1130
+# Note: this assumes that the point is on the curve.
+def is_in_g1_subgroup(point: G1Point) -> bool:
+    count(SUBGROUP_CHECKS)
+    if is_identity(point):
+        return True
+    return g1_eq(g1_endomorphism(point), neg(multiply_wnaf(point, BLS_X ** 2)))
+
+
+# A point on the twisted curve is in G2 if and only if psi(P) == x * P
+# See: https://eprint.iacr.org/2021/1130
+# Note: this assumes that the point is on the twisted curve.
+def is_in_g2_subgroup(point: G2Point) -> bool:
+    count(SUBGROUP_CHECKS)
+    if is_identity(point):
+        return True
+    # x is negative, so we multiply by |x| and negate
+    return g2_eq(g2_psi(point), neg(multiply_wnaf(point, -BLS_X)))
+
+
+# Checks that a point is in the prime order subgroup using the
+# endomorphism based checks. If `cross_check` is True, the result
+# is also compared against the slow check
+def is_in_subgroup(point: Union[G1Point, G2Point], cross_check: bool = False):
+    if isinstance(point[0], FQ2):
+        in_subgroup = is_in_g2_subgroup(point)
+    else:
+        in_subgroup = is_in_g1_subgroup(point)
+
+    if cross_check:
+        assert in_subgroup == is_in_subgroup_slow(point)
+
+    return in_subgroup
+
+
+# The default soundness of the batched subgroup check. A list of points containing
+# a point outside of the subgroup passes with probability at most 2^-128
+SUBGROUP_CHECK_SOUNDNESS_BITS = 128
+
+# The batched subgroup check precomputes all subset sums of this many points at a time
+SUBGROUP_CHECK_GROUP_SIZE = 6
+
+
+@ dataclass
+class SubgroupCheckResult:
+    # True if every point was found to be in the subgroup
+    passed: bool
+    # A list with a point outside of the subgroup will pass with probability at most
+    # 2^-soundness_bits. This is `inf` when every point was checked individually.
+    soundness_bits: float
+    # The index of a point that is not in the subgroup, if the check failed
+    failing_index: Optional[int] = None
+
+
+# Checks that every point in the list is in the prime order subgroup.
+#
+# Each round picks a random subset of the points and checks that their sum is in the subgroup.
+# If some point is not in the subgroup, then the sum is in the subgroup with probability
+# at most 1/2. This is because flipping whether that point is in the subset changes the sum by
+# a point outside of the subgroup. Hence `soundness_bits` rounds are needed.
+#
+# When a round fails, the subset is bisected to find the index of a point outside of the subgroup.
+#
+# Note: this assumes that the points are on the curve.
+def batch_is_in_subgroup(points: List[Union[G1Point, G2Point]], soundness_bits: int = SUBGROUP_CHECK_SOUNDNESS_BITS) -> SubgroupCheckResult:
+    num_points = len(points)
+    count(BATCH_SUBGROUP_CHECK_POINTS, num_points)
+
+    # With fewer points than rounds, checking each point is cheaper
+    if num_points <= soundness_bits:
+        for i, point in enumerate(points):
+            if is_in_subgroup(point) == False:
+                return SubgroupCheckResult(False, inf, i)
+        return SubgroupCheckResult(True, inf)
+
+    # Each round is described by a bitmask over the points
+    subsets = [randbits(num_points) for _ in range(soundness_bits)]
+    subset_sums = _subset_sums(points, subsets)
+
+    for subset, subset_sum in zip(subsets, subset_sums):
+        if is_in_subgroup(subset_sum) == False:
+            indices = [i for i in range(num_points) if (subset >> i) & 1]
+            failing_index = _bisect_subgroup_check(points, indices)
+            return SubgroupCheckResult(False, soundness_bits, failing_index)
+
+    return SubgroupCheckResult(True, soundness_bits)
+
+
+# Computes the sum of the points in each subset.
+# For each group of `SUBGROUP_CHECK_GROUP_SIZE` points, we compute every possible subset sum
+# once, so that each subset only needs one addition per group.
+def _subset_sums(points: List[Union[G1Point, G2Point]], subsets: List[int]):
+    one = points[0][0].one()
+    identity = (one, one, one.zero())
+
+    sums = [identity] * len(subsets)
+    for start in range(0, len(points), SUBGROUP_CHECK_GROUP_SIZE):
+        group = points[start: start + SUBGROUP_CHECK_GROUP_SIZE]
+
+        # table[mask] is the sum of the points in the group selected by `mask`
+        table = [identity]
+        for point in group:
+            table = table + [add(entry, point) for entry in table]
+
+        mask = (1 << len(group)) - 1
+        for i, subset in enumerate(subsets):
+            selected = (subset >> start) & mask
+            if selected != 0:
+                sums[i] = add(sums[i], table[selected])
+
+    return sums
+
+
+# Given indices of points whose sum is not in the subgroup, returns the index
+# of a point that is not in the subgroup.
+# If the sum of both halves were in the subgroup, then their sum would be too.
+# So at least one of the halves has a sum that is not in the subgroup.
+def _bisect_subgroup_check(points: List[Union[G1Point, G2Point]], indices: List[int]) -> int:
+    while len(indices) > 1:
+        half = indices[:len(indices) // 2]
+        half_sum = points[half[0]]
+        for i in half[1:]:
+            half_sum = add(half_sum, points[i])
+
+        if is_in_subgroup(half_sum) == False:
+            indices = half
+        else:
+            indices = indices[len(indices) // 2:]
+
+    return indices[0]
+
+
+# The default window size for the wNAF scalar multiplication.
+# Larger windows need fewer additions, but a larger table of precomputed points
+WNAF_WINDOW_SIZE = 5
+
+
+# Returns the width-w non-adjacent form of a non-negative scalar, least significant digit first.
+# Each non-zero digit is odd and lies in (-2^(w-1), 2^(w-1)), and any w consecutive digits
+# contain at most one non-zero digit.
+def wnaf(scalar: int, window_size: int = WNAF_WINDOW_SIZE) -> List[int]:
+    assert scalar >= 0
+    assert window_size >= 2
+
+    window_mask = (1 << window_size) - 1
+    half_window = 1 << (window_size - 1)
+
+    digits = []
+    while scalar > 0:
+        digit = 0
+        if scalar & 1:
+            digit = scalar & window_mask
+            if digit >= half_window:
+                digit -= 1 << window_size
+            scalar -= digit
+        digits.append(digit)
+        scalar >>= 1
+    return digits
+
+
+# Returns the odd multiples [P, 3P, 5P, ..., (2^(w-1) - 1)P] needed by a wNAF of width w
+def _wnaf_table(point: Union[G1Point, G2Point], window_size: int):
+    double_point = double(point)
+    table = [point]
+    for _ in range((1 << (window_size - 2)) - 1):
+        table.append(add(table[-1], double_point))
+    return table
+
+
+# Computes sum(scalars[i] * points[i]) by walking the wNAF digits of all of the scalars
+# at once, so that the doublings are shared between the points.
+# `tables` are the odd multiples of each point, see `_wnaf_table`
+def _multiply_wnaf_interleaved(tables: List[list], scalars: List[int], window_size: int):
+    one = tables[0][0][0].one()
+    result = (one, one, one.zero())
+
+    digits = [wnaf(scalar, window_size) for scalar in scalars]
+    num_digits = max(len(scalar_digits) for scalar_digits in digits)
+
+    for i in reversed(range(num_digits)):
+        if is_identity(result) == False:
+            result = double(result)
+        for table, scalar_digits in zip(tables, digits):
+            if i >= len(scalar_digits):
+                continue
+            digit = scalar_digits[i]
+            if digit > 0:
+                result = add(result, table[digit >> 1])
+            elif digit < 0:
+                result = add(result, neg(table[(-digit) >> 1]))
+
+    return result
+
+
+# Multiplies a G1 or G2 point by a non-negative scalar using a wNAF of width `window_size`
+def multiply_wnaf(point: Union[G1Point, G2Point], scalar: int, window_size: int = WNAF_WINDOW_SIZE):
+    if scalar == 0 or is_identity(point):
+        one = point[0].one()
+        return (one, one, one.zero())
+
+    table = _wnaf_table(point, window_size)
+    return _multiply_wnaf_interleaved([table], [scalar], window_size)
+
+
+# Multiplies a G1 point by a scalar using the GLV method.
+#
+# The endomorphism acts on G1 as multiplication by -x^2. So writing k = k_2 * x^2 + k_1
+# with k_1 < x^2, we have that k * P = k_1 * P + k_2 * (-endomorphism(P)).
+# Both k_1 and k_2 are roughly half the size of the curve order, which halves the
+# number of doublings. The table for -endomorphism(P) is derived from the table for P for free.
+#
+# Note: this is only correct for points in the G1 subgroup.
+def multiply_g1_glv(point: G1Point, scalar: int, window_size: int = WNAF_WINDOW_SIZE):
+    scalar = scalar % curve_order
+    if scalar == 0 or is_identity(point):
+        return multiply_wnaf(point, 0)
+
+    k_2, k_1 = divmod(scalar, BLS_X ** 2)
+
+    table = _wnaf_table(point, window_size)
+    endo_table = [neg(g1_endomorphism(entry)) for entry in table]
+    return _multiply_wnaf_interleaved([table, endo_table], [k_1, k_2], window_size)
+
+
+# The window size of the fixed-base tables. Each table holds
+# 2^(w-1) points per window, so 4224 points for the default of 8
+FIXED_BASE_WINDOW_SIZE = 8
+
+# The SHA-256 digests, see `_fixed_base_table_digest`, of the generator tables with the default window size.
+# A table read from the directory set with `set_generator_table_directory` must have one of these digests,
+# so a table that was replaced in that directory is not used
+_GENERATOR_TABLE_DIGESTS = {
+    "g1": "65cfe487e8c25b2f9bdec989a761363850caa2b24e9a5097957714ea9918287a",
+    "g2": "6b7bf91cfea72bf83f0be349a977bf258f038cd69de1f0984c821a2ba0fd9daa",
+}
+
+
+# Writes a scalar as `num_windows` signed base-2^w digits, least significant first.
+# Each digit lies in [-2^(w-1), 2^(w-1)), so only the positive multiples need to be tabulated.
+def _signed_window_digits(scalar: int, window_size: int, num_windows: int) -> List[int]:
+    window_mask = (1 << window_size) - 1
+    half_window = 1 << (window_size - 1)
+
+    digits = []
+    for _ in range(num_windows):
+        digit = scalar & window_mask
+        scalar >>= window_size
+        if digit >= half_window:
+            digit -= 1 << window_size
+            scalar += 1
+        digits.append(digit)
+    assert scalar == 0
+    return digits
+
+
+# Precomputed multiples of a point that is multiplied by many scalars, such as a generator.
+#
+# For each window j, the table holds m * 2^(w*j) * P for 1 <= m <= 2^(w-1).
+# Writing the scalar in signed base-2^w digits, k * P is the sum of a single entry from
+# each window, which is about 33 additions and no doublings, instead of the ~255 doublings
+# of a variable-base multiplication. Building the table costs about 4000 additions.
+class FixedBaseTable:
+    def __init__(self, point: Union[G1Point, G2Point], window_size: int = FIXED_BASE_WINDOW_SIZE, windows: Optional[List[list]] = None):
+        self.point = point
+        self.window_size = window_size
+        # The top window takes the carry out of the digits below it
+        self.num_windows = -(-curve_order.bit_length() // window_size) + 1
+        if windows is None:
+            windows = self.__build()
+        self.windows = windows
+
+    def __build(self) -> List[list]:
+        half_window = 1 << (self.window_size - 1)
+        entries = []
+        base = self.point
+        for _ in range(self.num_windows):
+            entry = base
+            entries.append(entry)
+            for _ in range(half_window - 1):
+                entry = add(entry, base)
+                entries.append(entry)
+            # `entry` is 2^(w-1) times the base of this window
+            base = double(entry)
+
+        # The entries are normalised, so that they can be written out as affine coordinates
+        entries = batch_normalize(entries)
+        return [entries[i: i + half_window] for i in range(0, len(entries), half_window)]
+
+    def multiply(self, scalar: int) -> Union[G1Point, G2Point]:
+        one = self.point[0].one()
+        result = (one, one, one.zero())
+        digits = _signed_window_digits(
+            scalar % curve_order, self.window_size, self.num_windows)
+        for window, digit in zip(self.windows, digits):
+            if digit > 0:
+                result = add(result, window[digit - 1])
+            elif digit < 0:
+                result = add(result, neg(window[-digit - 1]))
+        return result
+
+    # A digest of the table, followed by the affine coordinates of each entry as 48 byte big-endian integers
+    def to_bytes(self) -> bytes:
+        coordinates = []
+        for window in self.windows:
+            for x, y, _ in window:
+                coordinates.extend(_field_element_ints(x) + _field_element_ints(y))
+        entries = b"".join(coordinate.to_bytes(48, "big")
+                           for coordinate in coordinates)
+        return _fixed_base_table_digest(self.point, self.window_size, entries) + entries
+
+    # The inverse of `to_bytes`. Returns None if the bytes are not a table for `point`.
+    #
+    # The digest covers the point, the window size and every entry, so a table that was
+    # built for another point or another window size, or that was corrupted on disk, is not accepted.
+    # Since the digest is stored with the table, every entry is also checked to be on the curve
+    # and the first two entries of each window are recomputed. The generator tables are
+    # further checked against the digests in `_GENERATOR_TABLE_DIGESTS`.
+    def from_bytes(point: Union[G1Point, G2Point], byts: bytes, window_size: int = FIXED_BASE_WINDOW_SIZE) -> Optional[FixedBaseTable]:
+        table = FixedBaseTable(point, window_size, windows=[])
+        half_window = 1 << (window_size - 1)
+        is_g2 = isinstance(point[0], FQ2)
+        entry_size = (4 if is_g2 else 2) * 48
+        digest_size = hashlib.sha256().digest_size
+        if len(byts) != digest_size + table.num_windows * half_window * entry_size:
+            return None
+        digest, byts = byts[:digest_size], byts[digest_size:]
+        if digest != _fixed_base_table_digest(point, window_size, byts):
+            return None
+
+        entries = []
+        for offset in range(0, len(byts), entry_size):
+            coordinates = [int.from_bytes(byts[i: i + 48], "big")
+                           for i in range(offset, offset + entry_size, 48)]
+            if is_g2:
+                entries.append((FQ2(coordinates[0:2]), FQ2(
+                    coordinates[2:4]), FQ2.one()))
+            else:
+                entries.append(
+                    (FQ(coordinates[0]), FQ(coordinates[1]), FQ.one()))
+        if all(is_on_curve(entry, b2 if is_g2 else b) for entry in entries) == False:
+            return None
+        table.windows = [entries[i: i + half_window]
+                         for i in range(0, len(entries), half_window)]
+
+        # The first entry of the j'th window is 2^(w*j) * P and the second entry is twice that
+        base = point
+        for window in table.windows:
+            if eq(window[0], base) == False or eq(window[1], double(base)) == False:
+                return None
+            for _ in range(window_size):
+                base = double(base)
+        return table
+
+
+def _field_element_ints(element: Union[FQ, FQ2]) -> List[int]:
+    if isinstance(element, FQ2):
+        return list(element.coeffs)
+    return [element.n]
+
+
+# The SHA-256 digest of the affine coordinates of the point, the window size and the entries of a table
+def _fixed_base_table_digest(point: Union[G1Point, G2Point], window_size: int, entries: bytes) -> bytes:
+    x, y = normalize(point)
+    digest = hashlib.sha256()
+    for coordinate in _field_element_ints(x) + _field_element_ints(y):
+        digest.update(coordinate.to_bytes(48, "big"))
+    digest.update(window_size.to_bytes(1, "big"))
+    digest.update(entries)
+    return digest.digest()
+
+
+# The fixed-base tables of the generators, built the first time that a generator is multiplied
+_generator_tables = {}
+
+# The directory that the generator tables are saved to and read from, if any
+_generator_table_directory: Optional[str] = None
+
+
+# Keeps the generator tables in `directory`, so that they are built once rather than once per process.
+# This should be called before the first multiplication of a generator.
+# Passing None keeps the tables in memory only, which is the default.
+def set_generator_table_directory(directory: Optional[str]):
+    global _generator_table_directory
+    _generator_table_directory = directory
+
+
+# Returns the table of a generator, reading it from the table directory or building it if needed.
+# Building the G2 table takes under a second, which is repaid by the first contribution to a fresh SRS
+# and costs a one-off delay when only a public key is derived.
+def _generator_table(name: str, generator: Union[G1Point, G2Point]) -> FixedBaseTable:
+    table = _generator_tables.get(name)
+    if table is not None:
+        return table
+
+    path = None
+    if _generator_table_directory is not None:
+        path = os.path.join(_generator_table_directory, "%s_generator_table_w%d.bin" % (
+            name, FIXED_BASE_WINDOW_SIZE))
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                byts = file.read()
+            if byts[:32].hex() == _GENERATOR_TABLE_DIGESTS[name]:
+                table = FixedBaseTable.from_bytes(generator, byts)
+
+    if table is None:
+        table = FixedBaseTable(generator)
+        if path is not None:
+            # Written under another name first, so that a concurrent reader never sees half a table
+            temporary_path = "%s.%d" % (path, os.getpid())
+            with open(temporary_path, "wb") as file:
+                file.write(table.to_bytes())
+            os.replace(temporary_path, path)
+
+    _generator_tables[name] = table
+    return table
+
+
+def g1_generator_table() -> FixedBaseTable:
+    return _generator_table("g1", G1Generator)
+
+
+def g2_generator_table() -> FixedBaseTable:
+    return _generator_table("g2", G2Generator)
+
+
+# Note: SRS points are required to be in the G1 subgroup, so the GLV method is used.
+# The generator, which every power of a fresh SRS starts as, is multiplied with its fixed-base table.
 def multiply_g1(point: G1Point, private_key: PrivateKey):
-    return multiply(point, private_key.scalar)
+    return multiply_g1_scalar(point, private_key.scalar)
+
+
+# Same as `multiply_g1`, for a scalar that is not wrapped in a PrivateKey, such as the powers of a private key
+def multiply_g1_scalar(point: G1Point, scalar: int):
+    count(G1_SCALAR_MULTIPLICATIONS)
+    if point == G1Generator:
+        return g1_generator_table().multiply(scalar)
+    return multiply_g1_glv(point, scalar)
 
 
+# The generator, which every public key is a multiple of, is multiplied with its fixed-base table
 def multiply_g2(point: G2Point, private_key: PrivateKey):
-    return multiply(point, private_key.scalar)
+    return multiply_g2_scalar(point, private_key.scalar)
+
+
+# Same as `multiply_g2`, for a scalar that is not wrapped in a PrivateKey
+def multiply_g2_scalar(point: G2Point, scalar: int):
+    count(G2_SCALAR_MULTIPLICATIONS)
+    if point == G2Generator:
+        return g2_generator_table().multiply(scalar)
+    return multiply_wnaf(point, scalar)
+
+
+# Computes the linear combination `sum(scalars[i] * points[i])` using
+# Pippenger's bucket method. This is considerably cheaper than
+# multiplying each point individually and then summing the results.
+# Works for both G1 and G2 points.
+def lincomb(points: List[Union[G1Point, G2Point]], scalars: List[int]):
+    assert len(points) == len(scalars)
+    assert len(points) > 0
+    count(MULTI_SCALAR_MULTIPLICATION_POINTS, len(points))
+
+    one = points[0][0].one()
+    identity = (one, one, one.zero())
+
+    # For a small number of points, the buckets are not worth it
+    if len(points) < 16:
+        result = identity
+        for point, scalar in zip(points, scalars):
+            result = add(result, multiply_wnaf(point, scalar))
+        return result
+
+    # The window size is chosen so that the number of buckets
+    # is a small fraction of the number of points
+    window_size = max(2, len(points).bit_length() - 5)
+    num_buckets = (1 << window_size) - 1
+    max_num_bits = max(scalars).bit_length()
+
+    result = identity
+    for shift in reversed(range(0, max_num_bits, window_size)):
+        for _ in range(window_size):
+            result = double(result)
+
+        # Each point is added to the bucket indexed by its window digit
+        buckets = [None] * num_buckets
+        for point, scalar in zip(points, scalars):
+            digit = (scalar >> shift) & num_buckets
+            if digit == 0:
+                continue
+            if buckets[digit - 1] is None:
+                buckets[digit - 1] = point
+            else:
+                buckets[digit - 1] = add(buckets[digit - 1], point)
+
+        # sum(digit * bucket[digit]) is computed with a running sum,
+        # starting from the bucket with the largest digit
+        running_sum = identity
+        window_sum = identity
+        for bucket in reversed(buckets):
+            if bucket is not None:
+                running_sum = add(running_sum, bucket)
+            window_sum = add(window_sum, running_sum)
+
+        result = add(result, window_sum)
+
+    return result
+
+
+# Deserialises a compressed G1 point and checks that it is in the subgroup
+# Decompression checks that the point is on the curve. The subgroup check can be skipped
+# when the caller checks the subgroup of many points at once, see `batch_is_in_subgroup`
+def compressed_bytes_to_g1(byts: bytes, subgroup_check: bool = True) -> G1Point:
+    count(G1_DECOMPRESSIONS)
+    point = decompress_G1(os2ip(byts))
+    if subgroup_check and is_in_g1_subgroup(point) == False:
+        raise ValueError("The given point is not in the G1 subgroup")
+    return point
+
 
+# Deserialises a compressed G2 point and checks that it is in the subgroup
+# Decompression checks that the point is on the curve. The subgroup check can be skipped
+# when the caller checks the subgroup of many points at once, see `batch_is_in_subgroup`
+def compressed_bytes_to_g2(byts: bytes, subgroup_check: bool = True) -> G2Point:
+    count(G2_DECOMPRESSIONS)
+    point = decompress_G2((os2ip(byts[:48]), os2ip(byts[48:])))
+    if subgroup_check and is_in_g2_subgroup(point) == False:
+        raise ValueError("The given point is not in the G2 subgroup")
+    return point
 
-def hex_str_to_g1(string: hex_str):
+
+# `decompress_G1` and `decompress_G2` accept several encodings of the same point:
+# they ignore the c_flag, reduce an x that is not smaller than the field modulus
+# and ignore every other bit of an identity point. The functions below check that the bytes
+# are the single encoding that `compressed_g1_to_bytes` and `compressed_g2_to_bytes` produce.
+# They do not check that the point is on the curve, so they are cheap enough to run on every point.
+def _has_canonical_flags(z: int) -> bool:
+    if z // POW_2_383 != 1:
+        return False
+    if (z % POW_2_383) // POW_2_382 == 1:
+        # The identity point has the c_flag and the b_flag set and every other bit cleared
+        return z == POW_2_383 + POW_2_382
+    return z % POW_2_381 < field_modulus
+
+
+def is_canonical_compressed_g1(byts: bytes) -> bool:
+    if len(byts) != 48:
+        return False
+    return _has_canonical_flags(os2ip(byts))
+
+
+def is_canonical_compressed_g2(byts: bytes) -> bool:
+    if len(byts) != 96:
+        return False
+    z1 = os2ip(byts[:48])
+    z2 = os2ip(byts[48:])
+    if _has_canonical_flags(z1) == False:
+        return False
+    if z1 == POW_2_383 + POW_2_382:
+        return z2 == 0
+    return z2 < field_modulus
+
+
+# Serialises a G1 point in compressed form. The 384-bit integer has the bit order:
+# (c_flag, b_flag, a_flag, x). c_flag is always 1, b_flag is 1 for the identity point
+# and a_flag is the leftmost bit of the y-coordinate.
+#
+# Note: this assumes that the point has been normalised, see `batch_normalize`
+def _normalized_g1_to_bytes(point: G1Point) -> bytes:
+    if is_identity(point):
+        return (POW_2_383 + POW_2_382).to_bytes(48, "big")
+    x, y, _ = point
+    a_flag = (y.n * 2) // field_modulus
+    return (x.n + a_flag * POW_2_381 + POW_2_383).to_bytes(48, "big")
+
+
+# Serialises a G2 point in compressed form. The imaginary part of x goes in the first 48 bytes
+# with the flags as in G1, where a_flag is taken from the imaginary part of y,
+# or the real part if the imaginary part is zero. The real part of x goes in the last 48 bytes.
+#
+# Note: this assumes that the point has been normalised, see `batch_normalize`
+def _normalized_g2_to_bytes(point: G2Point) -> bytes:
+    if is_identity(point):
+        return (POW_2_383 + POW_2_382).to_bytes(48, "big") + bytes(48)
+    x, y, _ = point
+    x_re, x_im = x.coeffs
+    y_re, y_im = y.coeffs
+    if y_im > 0:
+        a_flag = (y_im * 2) // field_modulus
+    else:
+        a_flag = (y_re * 2) // field_modulus
+    z1 = x_im + a_flag * POW_2_381 + POW_2_383
+    return z1.to_bytes(48, "big") + x_re.to_bytes(48, "big")
+
+
+def compressed_g1_to_bytes(point: G1Point) -> bytes:
+    return _normalized_g1_to_bytes(normalize_point(point))
+
+
+def compressed_g2_to_bytes(point: G2Point) -> bytes:
+    return _normalized_g2_to_bytes(normalize_point(point))
+
+
+# Serialises a list of G2 points in compressed form with a single field inversion
+def compressed_g2_points_to_bytes(points: List[G2Point]) -> List[bytes]:
+    return [_normalized_g2_to_bytes(point) for point in batch_normalize(points)]
+
+
+# Serialises a G1 point in uncompressed form. The first 48 bytes hold x with the flags as in
+# compressed form, except that c_flag is always 0 and a_flag is unused. The last 48 bytes hold y.
+#
+# This is twice the size of the compressed form, but deserialising it does not need a square root.
+# Note: this assumes that the point has been normalised, see `batch_normalize`
+def _normalized_g1_to_bytes_uncompressed(point: G1Point) -> bytes:
+    if is_identity(point):
+        return POW_2_382.to_bytes(48, "big") + bytes(48)
+    x, y, _ = point
+    return x.n.to_bytes(48, "big") + y.n.to_bytes(48, "big")
+
+
+# Serialises a G2 point in uncompressed form, as x followed by y.
+# Each coordinate is written imaginary part first, and the flags are set as in G1.
+#
+# Note: this assumes that the point has been normalised, see `batch_normalize`
+def _normalized_g2_to_bytes_uncompressed(point: G2Point) -> bytes:
+    if is_identity(point):
+        return POW_2_382.to_bytes(48, "big") + bytes(144)
+    x, y, _ = point
+    x_re, x_im = x.coeffs
+    y_re, y_im = y.coeffs
+    return b"".join(coeff.to_bytes(48, "big") for coeff in (x_im, x_re, y_im, y_re))
+
+
+def g1_to_bytes_uncompressed(point: G1Point) -> bytes:
+    return _normalized_g1_to_bytes_uncompressed(normalize_point(point))
+
+
+def g2_to_bytes_uncompressed(point: G2Point) -> bytes:
+    return _normalized_g2_to_bytes_uncompressed(normalize_point(point))
+
+
+# Parses the flags and the coordinates of an uncompressed point.
+# Returns None for the identity point
+def _parse_uncompressed(byts: bytes, num_coeffs: int) -> Optional[List[int]]:
+    if len(byts) != 48 * num_coeffs:
+        raise ValueError("An uncompressed point must be %d bytes" %
+                         (48 * num_coeffs))
+    coeffs = [os2ip(byts[i: i + 48]) for i in range(0, len(byts), 48)]
+
+    c_flag = coeffs[0] >> 383
+    b_flag = (coeffs[0] >> 382) & 1
+    a_flag = (coeffs[0] >> 381) & 1
+    coeffs[0] %= POW_2_381
+    if c_flag == 1 or a_flag == 1:
+        raise ValueError("Invalid flags for an uncompressed point")
+
+    if b_flag == 1:
+        if any(coeff != 0 for coeff in coeffs):
+            raise ValueError(
+                "The identity point must have zero coordinates")
+        return None
+
+    if any(coeff >= field_modulus for coeff in coeffs):
+        raise ValueError("Point coordinates must be less than the field modulus")
+    return coeffs
+
+
+# Deserialises an uncompressed G1 point and checks that it is in the subgroup
+# Unlike decompression, this has to check that the point is on the curve.
+# The subgroup check can be skipped as in `compressed_bytes_to_g1`
+def uncompressed_bytes_to_g1(byts: bytes, subgroup_check: bool = True) -> G1Point:
+    coeffs = _parse_uncompressed(byts, 2)
+    if coeffs is None:
+        return (FQ.one(), FQ.one(), FQ.zero())
+
+    x, y = coeffs
+    point = (FQ(x), FQ(y), FQ.one())
+    if is_on_curve(point, b) == False:
+        raise ValueError("The given point is not on the G1 curve")
+    if subgroup_check and is_in_g1_subgroup(point) == False:
+        raise ValueError("The given point is not in the G1 subgroup")
+    return point
+
+
+# Deserialises an uncompressed G2 point and checks that it is in the subgroup
+# Unlike decompression, this has to check that the point is on the curve.
+# The subgroup check can be skipped as in `compressed_bytes_to_g2`
+def uncompressed_bytes_to_g2(byts: bytes, subgroup_check: bool = True) -> G2Point:
+    coeffs = _parse_uncompressed(byts, 4)
+    if coeffs is None:
+        return (FQ2.one(), FQ2.one(), FQ2.zero())
+
+    x_im, x_re, y_im, y_re = coeffs
+    point = (FQ2((x_re, x_im)), FQ2((y_re, y_im)), FQ2.one())
+    if is_on_curve(point, b2) == False:
+        raise ValueError("The given point is not on the G2 curve")
+    if subgroup_check and is_in_g2_subgroup(point) == False:
+        raise ValueError("The given point is not in the G2 subgroup")
+    return point
+
+
+# The encodings that a point can be serialised with, see `SerialisedSRS`.
+# The transcript that is published always uses compressed points.
+COMPRESSED = "compressed"
+UNCOMPRESSED = "uncompressed"
+
+
+def hex_str_to_g1(string: hex_str, subgroup_check: bool = True, encoding: str = COMPRESSED):
     serialised_point = bytes_from_hex(string)
-    return compressed_bytes_to_g1(serialised_point)
+    if encoding == UNCOMPRESSED:
+        return uncompressed_bytes_to_g1(serialised_point, subgroup_check)
+    return compressed_bytes_to_g1(serialised_point, subgroup_check)
 
 
 def g1_to_hex_str(point: G1Point):
@@ -82,9 +996,23 @@ def g2_to_hex_str(point: G2Point):
     return bytes_to_hex(compressed_g2_to_bytes(point))
 
 
-def hex_str_to_g2(string: hex_str):
+# Serialises a list of G1 points with a single field inversion
+def g1_points_to_hex_strs(points: List[G1Point], encoding: str = COMPRESSED) -> List[hex_str]:
+    to_bytes = _normalized_g1_to_bytes_uncompressed if encoding == UNCOMPRESSED else _normalized_g1_to_bytes
+    return [bytes_to_hex(to_bytes(point)) for point in batch_normalize(points)]
+
+
+# Serialises a list of G2 points with a single field inversion
+def g2_points_to_hex_strs(points: List[G2Point], encoding: str = COMPRESSED) -> List[hex_str]:
+    to_bytes = _normalized_g2_to_bytes_uncompressed if encoding == UNCOMPRESSED else _normalized_g2_to_bytes
+    return [bytes_to_hex(to_bytes(point)) for point in batch_normalize(points)]
+
+
+def hex_str_to_g2(string: hex_str, subgroup_check: bool = True, encoding: str = COMPRESSED):
     serialised_point = bytes_from_hex(string)
-    return compressed_bytes_to_g2(serialised_point)
+    if encoding == UNCOMPRESSED:
+        return uncompressed_bytes_to_g2(serialised_point, subgroup_check)
+    return compressed_bytes_to_g2(serialised_point, subgroup_check)
 
 
 @ dataclass
@@ -111,6 +1039,22 @@ class PrivateKey:
             return PrivateKey(0)
         return PrivateKey(pow(self.scalar, i, curve_order))
 
+    # Returns the scalars of the private key raised to the powers 0, 1, ..., n-1
+    # This is equivalent to calling `pow_i` for each power, however each power
+    # is computed from the previous one using a single modular multiplication.
+    # The scalars are not wrapped in PrivateKey objects, since there is one for every point of the SRS
+    def powers(self, n: int) -> List[int]:
+        # Same edge case as `pow_i`
+        if self.scalar == 0:
+            return [0] * n
+
+        powers = []
+        running_product = 1
+        for _ in range(n):
+            powers.append(running_product)
+            running_product = (running_product * self.scalar) % curve_order
+        return powers
+
 
 @ dataclass
 class PublicKey:
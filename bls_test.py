@@ -1,8 +1,35 @@
+import os
+import random
+import tempfile
 import unittest
-from bls import G1Generator, G2Generator, compressed_g1_to_bytes, compressed_g2_to_bytes
+from py_ecc.optimized_bls12_381 import FQ, FQ2, eq, field_modulus, multiply, b2
+from py_ecc.bls.point_compression import modular_squareroot_in_FQ2
+from py_ecc.bls.g2_primatives import G1_to_pubkey, G2_to_signature
+import bls
+from bls import (FixedBaseTable, batch_normalize, normalize_point, is_identity, is_canonical_compressed_g1, is_canonical_compressed_g2, G1Generator, G2Generator, PreparedG2, PrivateKey, multi_pairing, prepared_g2_generator, batch_is_in_subgroup, g1_to_bytes_uncompressed, g2_to_bytes_uncompressed, uncompressed_bytes_to_g1, uncompressed_bytes_to_g2, compressed_g1_to_bytes, compressed_g2_to_bytes, curve_order, g1_points_to_hex_strs, g2_points_to_hex_strs, is_in_g1, is_in_g2,
+                 is_in_subgroup, is_in_subgroup_slow, g1_eq, g2_eq, multiply_g1, multiply_g1_glv, multiply_g2, multiply_wnaf, neg_g1, pairing_check)
 from common import bytes_to_hex
 
 
+# Returns a random point on the G1 curve, which is most likely not in the subgroup
+def random_g1_curve_point():
+    while True:
+        x = random.randrange(field_modulus)
+        y_squared = (x ** 3 + 4) % field_modulus
+        y = pow(y_squared, (field_modulus + 1) // 4, field_modulus)
+        if pow(y, 2, field_modulus) == y_squared:
+            return (FQ(x), FQ(y), FQ(1))
+
+
+# Returns a random point on the G2 twisted curve, which is most likely not in the subgroup
+def random_g2_curve_point():
+    while True:
+        x = FQ2([random.randrange(field_modulus), random.randrange(field_modulus)])
+        y = modular_squareroot_in_FQ2(x ** 3 + b2)
+        if y is not None:
+            return (x, y, FQ2.one())
+
+
 class TestSRS(unittest.TestCase):
 
     def test_generator_consistency(self):
@@ -23,6 +50,274 @@ class TestSRS(unittest.TestCase):
         self.assertEqual(got_g1, expected_g1_gen)
         self.assertEqual(got_g2, expected_g2_gen)
 
+    def test_pairing_check(self):
+        """
+            Checks that the multi-pairing check accepts e(aG1, G2) == e(G1, aG2)
+            and rejects e(aG1, G2) == e(G1, bG2)
+        """
+        a = PrivateKey(123)
+        b = PrivateKey(456)
+
+        a_g1 = multiply_g1(G1Generator, a)
+        a_g2 = multiply_g2(G2Generator, a)
+        b_g2 = multiply_g2(G2Generator, b)
+
+        self.assertTrue(pairing_check(
+            [(a_g1, G2Generator), (neg_g1(G1Generator), a_g2)]))
+        self.assertFalse(pairing_check(
+            [(a_g1, G2Generator), (neg_g1(G1Generator), b_g2)]))
+
+    def test_prepared_g2_pairing(self):
+        """
+            Checks that pairing with a prepared G2 point gives the same result as
+            pairing with the point itself, including for projective and identity points
+        """
+        a = PrivateKey(123)
+        a_g1 = multiply_g1(G1Generator, a)
+        a_g2 = multiply_g2(G2Generator, a)
+        prepared_a_g2 = PreparedG2(a_g2)
+
+        self.assertEqual(multi_pairing([(a_g1, prepared_a_g2)]),
+                         multi_pairing([(a_g1, a_g2)]))
+        self.assertTrue(pairing_check(
+            [(a_g1, prepared_g2_generator()), (neg_g1(G1Generator), prepared_a_g2)]))
+        self.assertFalse(pairing_check(
+            [(G1Generator, prepared_g2_generator()), (neg_g1(G1Generator), prepared_a_g2)]))
+
+        identity_g1 = multiply(G1Generator, 0)
+        identity_g2 = multiply(G2Generator, 0)
+        self.assertTrue(pairing_check([(identity_g1, prepared_a_g2)]))
+        self.assertTrue(pairing_check([(a_g1, PreparedG2(identity_g2))]))
+
+    def test_fast_subgroup_checks_agree_with_slow_check(self):
+        """
+            Checks that the endomorphism based subgroup checks agree with
+            the slow check, for points inside and outside of the subgroup
+        """
+        off_subgroup_g1 = random_g1_curve_point()
+        off_subgroup_g2 = random_g2_curve_point()
+
+        g1_corpus = [
+            G1Generator,
+            multiply(G1Generator, 0),
+            multiply(G1Generator, 123456789),
+            # Point of order 3
+            (FQ(0), FQ(2), FQ(1)),
+            # Point not in the subgroup
+            off_subgroup_g1,
+            # Point with only a low order component
+            multiply(off_subgroup_g1, curve_order),
+        ]
+        g2_corpus = [
+            G2Generator,
+            multiply(G2Generator, 0),
+            multiply(G2Generator, 123456789),
+            # Point not in the subgroup
+            off_subgroup_g2,
+            # Point with only a low order component
+            multiply(off_subgroup_g2, curve_order),
+        ]
+
+        for point in g1_corpus:
+            self.assertTrue(is_in_g1(point))
+            self.assertEqual(is_in_subgroup(point),
+                             is_in_subgroup_slow(point))
+        for point in g2_corpus:
+            self.assertTrue(is_in_g2(point))
+            self.assertEqual(is_in_subgroup(point),
+                             is_in_subgroup_slow(point))
+
+        self.assertFalse(is_in_subgroup(off_subgroup_g1, cross_check=True))
+        self.assertFalse(is_in_subgroup(off_subgroup_g2, cross_check=True))
+
+    def test_batch_subgroup_check_finds_offending_index(self):
+        """
+            Checks that the batched subgroup check accepts points in the subgroup
+            and names the index of a point that is not in the subgroup
+        """
+        soundness_bits = 32
+        points = [multiply(G1Generator, i) for i in range(1, 41)]
+
+        result = batch_is_in_subgroup(points, soundness_bits)
+        self.assertTrue(result.passed)
+        self.assertEqual(result.soundness_bits, soundness_bits)
+
+        # Replace a point with the point of order 3
+        points[13] = (FQ(0), FQ(2), FQ(1))
+
+        result = batch_is_in_subgroup(points, soundness_bits)
+        self.assertFalse(result.passed)
+        self.assertEqual(result.failing_index, 13)
+
+    def test_scalar_multiplication_engines(self):
+        """
+            Checks that the wNAF and GLV scalar multiplications agree
+            with double-and-add for each window size
+        """
+        g1_point = multiply(G1Generator, 987654321)
+        g2_point = multiply(G2Generator, 987654321)
+        scalars = [0, 1, 2, curve_order - 1, random.randrange(curve_order)]
+
+        for window_size in [2, 4, 5]:
+            for scalar in scalars:
+                expected_g1 = multiply(g1_point, scalar)
+                self.assertTrue(g1_eq(expected_g1, multiply_wnaf(
+                    g1_point, scalar, window_size)))
+                self.assertTrue(g1_eq(expected_g1, multiply_g1_glv(
+                    g1_point, scalar, window_size)))
+
+            expected_g2 = multiply(g2_point, scalars[-1])
+            self.assertTrue(g2_eq(expected_g2, multiply_wnaf(
+                g2_point, scalars[-1], window_size)))
+
+    def test_batch_serialisation_matches_py_ecc(self):
+        """
+            Checks that serialising a list of points with a single inversion
+            gives the same encoding as py_ecc, including for the identity point
+        """
+        g1_points = [multiply(G1Generator, i) for i in range(4)]
+        g2_points = [multiply(G2Generator, i) for i in range(3)]
+
+        expected_g1 = [bytes_to_hex(G1_to_pubkey(point)) for point in g1_points]
+        expected_g2 = [bytes_to_hex(G2_to_signature(point))
+                       for point in g2_points]
+
+        self.assertEqual(g1_points_to_hex_strs(g1_points), expected_g1)
+        self.assertEqual(g2_points_to_hex_strs(g2_points), expected_g2)
+
+    def test_uncompressed_roundtrip(self):
+        """
+            Checks that points survive the uncompressed encoding, including the identity point,
+            and that points which are not on the curve or have the compression flag set are rejected
+        """
+        for i in range(3):
+            g1_point = multiply(G1Generator, i)
+            g2_point = multiply(G2Generator, i)
+
+            g1_bytes = g1_to_bytes_uncompressed(g1_point)
+            g2_bytes = g2_to_bytes_uncompressed(g2_point)
+            self.assertEqual(len(g1_bytes), 96)
+            self.assertEqual(len(g2_bytes), 192)
+            self.assertTrue(g1_eq(uncompressed_bytes_to_g1(g1_bytes), g1_point))
+            self.assertTrue(g2_eq(uncompressed_bytes_to_g2(g2_bytes), g2_point))
+
+        g1_bytes = g1_to_bytes_uncompressed(G1Generator)
+        g2_bytes = g2_to_bytes_uncompressed(G2Generator)
+        off_curve_g1 = g1_bytes[:-1] + bytes([g1_bytes[-1] ^ 1])
+        off_curve_g2 = g2_bytes[:-1] + bytes([g2_bytes[-1] ^ 1])
+        compressed_flag = bytes([g1_bytes[0] | 0x80]) + g1_bytes[1:]
+
+        for (decode, byts) in [(uncompressed_bytes_to_g1, off_curve_g1), (uncompressed_bytes_to_g2, off_curve_g2), (uncompressed_bytes_to_g1, compressed_flag)]:
+            with self.assertRaises(ValueError):
+                decode(byts)
+
+    def test_canonical_compressed_encodings(self):
+        """
+            Checks that only the encodings produced by the serialisation are canonical,
+            although the decoder accepts the others as the same point
+        """
+        for (to_bytes, is_canonical, generator) in [(compressed_g1_to_bytes, is_canonical_compressed_g1, G1Generator), (compressed_g2_to_bytes, is_canonical_compressed_g2, G2Generator)]:
+            for point in [generator, multiply(generator, 5), multiply(generator, 0)]:
+                self.assertTrue(is_canonical(to_bytes(point)))
+
+            byts = to_bytes(generator)
+            identity = to_bytes(multiply(generator, 0))
+            without_c_flag = bytes([byts[0] & 0x7f]) + byts[1:]
+            identity_with_junk = identity[:-1] + b"\x01"
+            for encoding in [without_c_flag, identity_with_junk, byts[:-1]]:
+                self.assertFalse(is_canonical(encoding))
+
+        # An x of p is decoded as an x of zero
+        c_flag = 1 << 383
+        self.assertFalse(is_canonical_compressed_g1(
+            (c_flag + field_modulus).to_bytes(48, "big")))
+        self.assertTrue(is_canonical_compressed_g1(
+            (c_flag + field_modulus - 1).to_bytes(48, "big")))
+        self.assertFalse(is_canonical_compressed_g2(
+            c_flag.to_bytes(48, "big") + field_modulus.to_bytes(48, "big")))
+
+    def test_fixed_base_tables(self):
+        """
+            Checks that multiplying with a fixed-base table matches the variable-base multiplication,
+            including the scalars that carry into the top window, and that tables survive serialisation
+        """
+        scalars = [0, 1, 7, 8, 15, curve_order - 1, (1 << 254) - 1] + \
+            [random.randrange(curve_order) for _ in range(5)]
+        for generator in [G1Generator, G2Generator]:
+            table = FixedBaseTable(generator, window_size=4)
+            for scalar in scalars:
+                self.assertTrue(
+                    eq(table.multiply(scalar), multiply_wnaf(generator, scalar)))
+
+            self.assertEqual(FixedBaseTable.from_bytes(
+                generator, table.to_bytes(), window_size=4).windows, table.windows)
+            # A table for another window size, or another point, is not accepted
+            self.assertIsNone(FixedBaseTable.from_bytes(
+                generator, table.to_bytes(), window_size=5))
+            self.assertIsNone(FixedBaseTable.from_bytes(
+                multiply(generator, 2), table.to_bytes(), window_size=4))
+            # Nor is a table with a corrupted entry
+            corrupted = bytearray(table.to_bytes())
+            corrupted[-1] ^= 1
+            self.assertIsNone(FixedBaseTable.from_bytes(
+                generator, bytes(corrupted), window_size=4))
+
+        # The default tables of the generators are used from the first multiplication
+        for i in range(3):
+            key = PrivateKey(random.randrange(curve_order))
+            self.assertTrue(eq(multiply_g1(G1Generator, key),
+                            multiply_g1_glv(G1Generator, key.scalar)))
+            self.assertTrue(eq(multiply_g2(G2Generator, key),
+                            multiply_wnaf(G2Generator, key.scalar)))
+
+    def test_normalize_point(self):
+        """
+            Checks that normalising a single point matches normalising it in a batch
+        """
+        for generator in [G1Generator, G2Generator]:
+            point = multiply_wnaf(generator, 12345)
+            self.assertEqual(normalize_point(point), batch_normalize([point])[0])
+            identity = multiply_wnaf(generator, 0)
+            self.assertTrue(is_identity(normalize_point(identity)))
+
+    def test_forged_generator_tables_are_not_used(self):
+        """
+            Checks that a generator table in the table directory whose entries were replaced,
+            with the digest stored in the file recomputed to match, is not used
+        """
+        table = FixedBaseTable(G1Generator, window_size=4)
+        entries = bytearray(table.to_bytes()[32:])
+        # An entry that is not on the curve
+        entries[100] ^= 1
+        forged = bls._fixed_base_table_digest(
+            G1Generator, 4, bytes(entries)) + bytes(entries)
+        self.assertIsNone(FixedBaseTable.from_bytes(
+            G1Generator, forged, window_size=4))
+
+        # An entry that is on the curve, but is not the right multiple of the generator
+        table = bls.g1_generator_table()
+        wrong_point = table.windows[3][5]
+        table = FixedBaseTable(G1Generator, windows=[
+                               list(window) for window in table.windows])
+        table.windows[0][5] = wrong_point
+        forged = table.to_bytes()
+        self.assertIsNotNone(FixedBaseTable.from_bytes(G1Generator, forged))
+
+        generator_tables = dict(bls._generator_tables)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "g1_generator_table_w%d.bin" % bls.FIXED_BASE_WINDOW_SIZE), "wb") as file:
+                file.write(forged)
+            bls.set_generator_table_directory(directory)
+            bls._generator_tables.clear()
+            try:
+                key = PrivateKey(6)
+                self.assertTrue(eq(multiply_g1(G1Generator, key),
+                                   multiply_g1_glv(G1Generator, key.scalar)))
+            finally:
+                bls.set_generator_table_directory(None)
+                bls._generator_tables.clear()
+                bls._generator_tables.update(generator_tables)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,10 @@
 import random
 import unittest
+from bls import FQ, G1Generator, g1_to_hex_str
 from keypair import KeyPair
-from actors import Coordinator, Contributor, Verifier, SRSParameters
-from srs import SerialisedSRS, SRS
+from actors import ROLLED_BACK, Coordinator, Contributor, StreamingContributor, Verifier, SRSParameters
+from sdk import Transcript, update_transcript
+from srs import STAGE_ENCODING, SerialisedSRS, SRS
 
 
 def new_contributor(params: SRSParameters, serialised_srs: SerialisedSRS) -> Contributor:
@@ -84,6 +86,200 @@ class TestSimpleCeremony(unittest.TestCase):
             unknown_contributor.keypair.public_key)
         self.assertIsNone(contributor_index)
 
+    def test_streaming_contributor(self):
+        """
+            Test that a contributor which updates the SRS a window at a time
+            produces the same contribution as a contributor which holds the whole SRS,
+            and that its inline subgroup checks catch a point of low order
+        """
+        parameters = SRSParameters(5, 2)
+        coordinator = Coordinator(SRS(parameters))
+        serialised_srs = coordinator.serialise_srs()
+
+        keypair = KeyPair(0x1234)
+        contributor = Contributor(keypair, parameters, serialised_srs)
+        expected_proof = contributor.update_srs()
+
+        streaming_contributor = StreamingContributor(keypair, parameters)
+        serialised_srs_updated = streaming_contributor.update_serialised_srs(
+            serialised_srs, window_size=2)
+        proof = streaming_contributor.update_proof()
+
+        self.assertEqual(serialised_srs_updated, contributor.serialise_srs())
+        self.assertEqual(proof, expected_proof)
+        self.assertTrue(streaming_contributor.all_elements_in_correct_subgroup())
+        self.assertTrue(coordinator.replace_current_srs(
+            serialised_srs_updated, proof))
+
+        # Replace a point with a point of order 3
+        serialised_srs.g1_points[3] = g1_to_hex_str((FQ(0), FQ(2), FQ(1)))
+        # The update stops at the window containing it, before the window is updated
+        streaming_contributor = StreamingContributor(keypair, parameters)
+        with self.assertRaises(ValueError):
+            streaming_contributor.update_serialised_srs(
+                serialised_srs, window_size=2)
+        self.assertFalse(
+            streaming_contributor.all_elements_in_correct_subgroup())
+        self.assertEqual(streaming_contributor.g1_update.failing_index, 3)
+        self.assertEqual(streaming_contributor.g1_update.num_points, 2)
+
+    def test_contributor_refuses_points_outside_subgroup(self):
+        """
+            Test that a contributor does not update an SRS with a point of low order,
+            since that would leak their secret modulo the order of the point
+        """
+        parameters = SRSParameters(5, 2)
+        serialised_srs = SRS(parameters).serialise()
+        serialised_srs.g1_points[3] = g1_to_hex_str((FQ(0), FQ(2), FQ(1)))
+
+        contributor = Contributor(KeyPair(0x1234), parameters, serialised_srs)
+        with self.assertRaises(ValueError):
+            contributor.update_srs()
+        self.assertEqual(contributor.srs, contributor.old_srs)
+
+        transcript = Transcript([SRS(parameters).serialise(), serialised_srs])
+        with self.assertRaises(ValueError):
+            update_transcript(
+                transcript, ["0x1234", "0x5678"], params=[parameters, parameters])
+
+    def test_coordinator_reuses_received_srs(self):
+        """
+            Test that the coordinator hands out the SRS it received once it verifies,
+            and re-serialises an SRS that was not in canonical form
+        """
+        parameters = SRSParameters(4, 2)
+        coordinator = Coordinator(SRS(parameters))
+        self.assertIs(coordinator.serialise_srs(), coordinator.serialise_srs())
+
+        contributor = Contributor(
+            KeyPair(0x1234), parameters, coordinator.serialise_srs())
+        proof = contributor.update_srs()
+        received_srs = contributor.serialise_srs()
+        self.assertTrue(coordinator.replace_current_srs(received_srs, proof))
+        self.assertEqual(coordinator.serialise_srs(), received_srs)
+        self.assertEqual(coordinator.serialise_srs(),
+                         coordinator.current_SRS.serialise())
+
+        contributor = Contributor(
+            KeyPair(0x5678), parameters, coordinator.serialise_srs())
+        proof = contributor.update_srs()
+        expected_srs = contributor.serialise_srs()
+        received_srs = contributor.serialise_srs()
+        received_srs.g1_points = ["0x" + power[2:].upper()
+                                  for power in received_srs.g1_points]
+        self.assertFalse(received_srs.is_canonical())
+        self.assertTrue(coordinator.replace_current_srs(received_srs, proof))
+        self.assertEqual(coordinator.serialise_srs(), expected_srs)
+
+        # The decoder ignores the c_flag, so clearing it gives another encoding of the same point.
+        # Such an encoding is malformed, so the contribution is rejected
+        contributor = Contributor(
+            KeyPair(0x9abc), parameters, coordinator.serialise_srs())
+        proof = contributor.update_srs()
+        received_srs = contributor.serialise_srs()
+        power = received_srs.g1_points[2]
+        received_srs.g1_points[2] = "0x%02x" % (
+            int(power[2:4], 16) & 0x7f) + power[4:]
+        self.assertFalse(received_srs.is_canonical())
+        self.assertFalse(coordinator.replace_current_srs(received_srs, proof))
+        self.assertEqual(coordinator.last_report.rejected_stage, STAGE_ENCODING)
+        self.assertEqual(coordinator.serialise_srs(), expected_srs)
+
+    def test_optimistic_coordinator(self):
+        """
+            Test that an optimistic coordinator accepts contributions after the cheap checks,
+            and that the audit finds a bad contribution and rolls back to the contribution before it
+        """
+        parameters = SRSParameters(4, 2)
+        starting_srs = SRS(parameters)
+        coordinator = Coordinator(starting_srs, optimistic=True)
+
+        # An honest contribution
+        honest = new_contributor(parameters, coordinator.serialise_srs())
+        honest_proof = honest.update_srs()
+        honest_srs = honest.serialise_srs()
+        self.assertTrue(coordinator.replace_current_srs(
+            honest_srs, honest_proof))
+
+        # A contribution where a power other than the degree-1 power was tampered with
+        # passes the cheap checks
+        dishonest = new_contributor(parameters, coordinator.serialise_srs())
+        dishonest_proof = dishonest.update_srs()
+        dishonest_srs = dishonest.serialise_srs()
+        dishonest_srs.g1_points[3] = g1_to_hex_str(G1Generator)
+        self.assertTrue(coordinator.replace_current_srs(
+            dishonest_srs, dishonest_proof))
+
+        # An honest contribution made on top of it
+        later = new_contributor(parameters, coordinator.serialise_srs())
+        later_proof = later.update_srs()
+        self.assertTrue(coordinator.replace_current_srs(
+            later.serialise_srs(), later_proof))
+
+        # A contribution with the wrong degree-1 point is rejected straight away
+        self.assertFalse(coordinator.replace_current_srs(
+            later.serialise_srs(), honest_proof))
+
+        self.assertEqual(coordinator.audit(), 1)
+        self.assertEqual(coordinator.update_proofs, [honest_proof])
+        self.assertEqual(coordinator.serialise_srs(), honest_srs)
+
+        # The ceremony continues from the last good contribution
+        retry = new_contributor(parameters, coordinator.serialise_srs())
+        retry_proof = retry.update_srs()
+        self.assertTrue(coordinator.replace_current_srs(
+            retry.serialise_srs(), retry_proof))
+        self.assertIsNone(coordinator.audit())
+        self.assertEqual(coordinator.num_audited, 2)
+
+        # The public keys of the dropped contributions are no longer found
+        self.assertEqual(coordinator.update_proof_index.find_many(
+            [honest_proof.public_key, dishonest_proof.public_key, later_proof.public_key, retry_proof.public_key]), [0, None, None, 1])
+
+        verifier = Verifier(parameters, starting_srs.serialise(
+        ), coordinator.serialise_srs(), coordinator.update_proofs)
+        self.assertTrue(verifier.verify_ceremony())
+
+    def test_audit_off_the_acceptance_path(self):
+        """
+            Test that an audit job can run while the coordinator keeps accepting contributions,
+            and that a contribution checked against an SRS that the audit dropped is rejected
+        """
+        parameters = SRSParameters(4, 2)
+        coordinator = Coordinator(SRS(parameters), optimistic=True)
+
+        dishonest = new_contributor(parameters, coordinator.serialise_srs())
+        dishonest_proof = dishonest.update_srs()
+        dishonest_srs = dishonest.serialise_srs()
+        dishonest_srs.g1_points[3] = g1_to_hex_str(G1Generator)
+        self.assertTrue(coordinator.replace_current_srs(
+            dishonest_srs, dishonest_proof))
+
+        audit = coordinator.audit_job()
+
+        # Accepted while the audit runs
+        later = new_contributor(parameters, coordinator.serialise_srs())
+        later_proof = later.update_srs()
+        self.assertTrue(coordinator.replace_current_srs(
+            later.serialise_srs(), later_proof))
+
+        # Being checked when the audit finishes
+        last = new_contributor(parameters, coordinator.serialise_srs())
+        last_proof = last.update_srs()
+        contribution = coordinator.contribution_job(
+            last.serialise_srs(), last_proof)
+        result = contribution.run()
+
+        self.assertEqual(coordinator.finish_audit(audit, audit.run()), 0)
+        self.assertEqual(coordinator.update_proofs, [])
+        self.assertEqual(coordinator.num_rollbacks, 1)
+
+        self.assertFalse(coordinator.finish_contribution(
+            contribution, last.serialise_srs(), last_proof, result))
+        self.assertEqual(coordinator.last_report.rejected_stage, ROLLED_BACK)
+        self.assertEqual(coordinator.serialise_srs(),
+                         SRS(parameters).serialise())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,244 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from actors import DEFAULT_AUDIT_BATCH_SIZE, ROLLED_BACK, Contributor, Coordinator
+from keypair import KeyPair
+from srs import SRS, SRSParameters, SerialisedSRS
+from srs_updates import UpdateProof
+
+# An asyncio front end for the coordinator in `actors.Coordinator`, which holds the state of the ceremony.
+#
+# Participants join a queue and are handed the SRS one at a time. Each participant
+# has `deadline` seconds to send back their contribution, after which they are disconnected
+# and the next participant is handed the SRS. Verification runs on a pool of worker processes,
+# so that the event loop is free to accept new participants and to hand out the SRS
+# while a contribution is being verified.
+#
+# The checks run as the coordinator's jobs, see `actors.CoordinatorJob`. The workers only need
+# the degree-1 point of the current SRS to verify a contribution, so the current SRS is never sent to them.
+#
+# In optimistic mode a contribution is accepted after the cheap checks and the contributions
+# accepted this way are audited on the workers in the background, see `actors.Coordinator.audit`.
+# Participants keep taking turns while an audit runs. If the audit finds a bad contribution,
+# the coordinator rolls back to the contribution before it once the audit has finished.
+# With a single worker, the audits and the cheap checks of each turn wait on each other.
+
+# The readme suggests an upper bound of about a minute per participant
+DEFAULT_CONTRIBUTION_DEADLINE = 60.0
+
+# The outcome of a participant's turn
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+TIMED_OUT = "timed out"
+
+# Recorded in `CoordinatorMetrics.rejected_stages` when a turn raised instead of
+# reaching a verdict. Either way the participant is rejected and the service moves on.
+PARTICIPANT_ERROR = "participant error"
+VERIFICATION_ERROR = "verification error"
+# `actors.ROLLED_BACK` is recorded when an audit dropped the SRS that a contribution
+# was made on while the contribution was being checked
+
+
+# A participant as seen by the coordinator. Implementations wrap the transport
+# that the participant is connected over, such as a websocket.
+class Participant(ABC):
+    name: str
+
+    # Sends the SRS to the participant and waits for their contribution.
+    # The coroutine is cancelled if the participant does not respond in time.
+    @abstractmethod
+    async def contribute(self, serialised_srs: SerialisedSRS) -> Tuple[SerialisedSRS, UpdateProof]:
+        pass
+
+
+# An in-process stand-in for a participant that is connected over the network.
+# The contribution is computed on a thread so that it does not block the event loop.
+# `delay` is the number of seconds the participant waits before contributing.
+class LocalParticipant(Participant):
+    def __init__(self, name: str, keypair: KeyPair, parameters: SRSParameters, delay: float = 0.0):
+        self.name = name
+        self.keypair = keypair
+        self.parameters = parameters
+        self.delay = delay
+
+    async def contribute(self, serialised_srs: SerialisedSRS) -> Tuple[SerialisedSRS, UpdateProof]:
+        await asyncio.sleep(self.delay)
+        return await asyncio.get_running_loop().run_in_executor(None, self.__contribute, serialised_srs)
+
+    def __contribute(self, serialised_srs: SerialisedSRS) -> Tuple[SerialisedSRS, UpdateProof]:
+        contributor = Contributor(
+            self.keypair, self.parameters, serialised_srs)
+        update_proof = contributor.update_srs()
+        return (contributor.serialise_srs(), update_proof)
+
+
+@dataclass
+class CoordinatorMetrics:
+    num_accepted: int = 0
+    num_rejected: int = 0
+    num_timed_out: int = 0
+    # Seconds spent waiting for participants to contribute, summed over all turns
+    contribution_time: float = 0.0
+    # Seconds spent waiting for the workers to verify contributions, summed over all turns
+    verification_time: float = 0.0
+    # Seconds that the service has been running for
+    running_time: float = 0.0
+    # The number of contributions rejected by each stage of `SRS.verify_updates_staged`
+    rejected_stages: Dict[str, int] = field(default_factory=dict)
+    # In optimistic mode, the number of audits that finished and the number of
+    # accepted contributions that they dropped
+    num_audits: int = 0
+    num_dropped: int = 0
+    # Seconds spent waiting for audits to finish, summed over all audits
+    audit_time: float = 0.0
+
+    def num_turns(self) -> int:
+        return self.num_accepted + self.num_rejected + self.num_timed_out
+
+    # The number of accepted contributions per second
+    def throughput(self) -> float:
+        if self.running_time == 0:
+            return 0.0
+        return self.num_accepted / self.running_time
+
+
+class CoordinatorService:
+    # If `executor` is None, a pool of `num_workers` processes is created when the service runs.
+    # `optimistic` and `audit_batch_size` are passed on to the `actors.Coordinator` that the service wraps;
+    # in optimistic mode, an audit is started once the coordinator says that one is due.
+    def __init__(self, srs: SRS, deadline: float = DEFAULT_CONTRIBUTION_DEADLINE, num_workers: int = 1, executor: Optional[Executor] = None,
+                 optimistic: bool = False, audit_batch_size: int = DEFAULT_AUDIT_BATCH_SIZE):
+        self.deadline = deadline
+        self.num_workers = num_workers
+        self.executor = executor
+
+        # The coordinator holds the state of the ceremony. The service only moves its checks onto the workers,
+        # which decompress the SRS on their own, so the coordinator is not given the pool
+        self.coordinator = Coordinator(
+            srs, optimistic=optimistic, audit_batch_size=audit_batch_size)
+        self.__audit: Optional[asyncio.Task] = None
+
+        # The participants waiting for their turn. None is queued to stop the service, see `stop`.
+        # This is not an `asyncio.Queue`, which binds to an event loop when it is created
+        # on older versions of Python, so that the service can be created outside of the loop it runs on
+        self.queue: Deque[Optional[Participant]] = deque()
+        # Set when a participant joins, once the service is running
+        self.__joined: Optional[asyncio.Event] = None
+        self.metrics = CoordinatorMetrics()
+        # The name of each participant that had a turn, with the outcome of their turn
+        self.history: List[Tuple[str, str]] = []
+
+    # Adds a participant to the back of the queue. This never waits.
+    def join(self, participant: Participant):
+        self.__put(participant)
+
+    # Stops the service once the participants that have already joined have had their turn
+    def stop(self):
+        self.__put(None)
+
+    def queue_length(self) -> int:
+        return len(self.queue)
+
+    def __put(self, participant: Optional[Participant]):
+        self.queue.append(participant)
+        if self.__joined is not None:
+            self.__joined.set()
+
+    # Returns the SRS that the next participant will be handed.
+    # Like `actors.Coordinator.serialise_srs`, this should not be modified.
+    def serialise_srs(self) -> SerialisedSRS:
+        return self.coordinator.serialise_srs()
+
+    # Hands the SRS to each participant in the queue until `stop` is called
+    async def run(self):
+        if self.executor is None:
+            with ProcessPoolExecutor(self.num_workers) as executor:
+                await self.__run(executor)
+        else:
+            await self.__run(self.executor)
+
+    async def __run(self, executor: Executor):
+        self.__joined = asyncio.Event()
+        start = time.perf_counter()
+        while True:
+            while len(self.queue) == 0:
+                self.__joined.clear()
+                await self.__joined.wait()
+            participant = self.queue.popleft()
+            if participant is None:
+                break
+
+            outcome = await self.__turn(participant, executor)
+            self.history.append((participant.name, outcome))
+            if self.__audit is not None and self.__audit.done():
+                # Raises if the audit did
+                self.__audit.result()
+                self.__audit = None
+            if self.__audit is None and self.coordinator.audit_due():
+                self.__audit = asyncio.create_task(self.__run_audit(executor))
+            self.metrics.running_time = time.perf_counter() - start
+
+        # Every contribution is audited before the service stops
+        if self.__audit is not None:
+            await self.__audit
+            self.__audit = None
+        while len(self.coordinator.unaudited_SRS) > 0:
+            await self.__run_audit(executor)
+        self.metrics.running_time = time.perf_counter() - start
+
+    # A participant that raises, or sends something that makes the verification raise,
+    # is rejected like any other bad contribution so that the rest of the queue is unaffected
+    async def __turn(self, participant: Participant, executor: Executor) -> str:
+        start = time.perf_counter()
+        try:
+            received_srs, update_proof = await asyncio.wait_for(participant.contribute(self.serialise_srs()), self.deadline)
+        except asyncio.TimeoutError:
+            self.metrics.num_timed_out += 1
+            return TIMED_OUT
+        except Exception:
+            return self.__reject(PARTICIPANT_ERROR)
+        finally:
+            self.metrics.contribution_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            job = self.coordinator.contribution_job(
+                received_srs, update_proof)
+            result = await asyncio.get_running_loop().run_in_executor(executor, job.function, *job.arguments)
+            accepted = self.coordinator.finish_contribution(
+                job, received_srs, update_proof, result)
+        except Exception:
+            return self.__reject(VERIFICATION_ERROR)
+        finally:
+            self.metrics.verification_time += time.perf_counter() - start
+
+        if accepted == False:
+            return self.__reject(self.coordinator.last_report.rejected_stage)
+        self.metrics.num_accepted += 1
+        return ACCEPTED
+
+    # Runs `actors.Coordinator.audit` on the workers, while the participants keep taking turns
+    async def __run_audit(self, executor: Executor):
+        job = self.coordinator.audit_job()
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, job.function, *job.arguments)
+        finally:
+            self.metrics.audit_time += time.perf_counter() - start
+
+        num_contributions = len(self.coordinator.update_proofs)
+        self.coordinator.finish_audit(job, result)
+        self.metrics.num_audits += 1
+        self.metrics.num_dropped += num_contributions - \
+            len(self.coordinator.update_proofs)
+
+    def __reject(self, stage: str) -> str:
+        self.metrics.num_rejected += 1
+        self.metrics.rejected_stages[stage] = self.metrics.rejected_stages.get(
+            stage, 0) + 1
+        return REJECTED
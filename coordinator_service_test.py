@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+from typing import Tuple
+from coordinator_service import (ACCEPTED, PARTICIPANT_ERROR, REJECTED, TIMED_OUT, CoordinatorService, LocalParticipant, Participant)
+from actors import Contributor, Verifier
+from bls import FQ2, G1Generator, PublicKey, g1_to_hex_str
+from keypair import KeyPair
+from srs import STAGE_DEGREE_1, STAGE_PROOF_POINTS, SRS, SRSParameters, SerialisedSRS
+from srs_updates import UpdateProof
+
+
+# Sends back the SRS it was given, claiming that it was updated
+class DishonestParticipant(Participant):
+    def __init__(self, name: str):
+        self.name = name
+
+    async def contribute(self, serialised_srs: SerialisedSRS) -> Tuple[SerialisedSRS, UpdateProof]:
+        public_key = KeyPair(0x1234).public_key
+        return (serialised_srs, UpdateProof(public_key, G1Generator))
+
+
+# Sends back an update proof whose public key is not on the curve
+class OffCurveParticipant(Participant):
+    def __init__(self, name: str, parameters: SRSParameters):
+        self.name = name
+        self.parameters = parameters
+
+    async def contribute(self, serialised_srs: SerialisedSRS) -> Tuple[SerialisedSRS, UpdateProof]:
+        contributor = Contributor(
+            KeyPair(0x1234), self.parameters, serialised_srs)
+        proof = contributor.update_srs()
+        x, y, z = proof.public_key.point
+        proof.public_key = PublicKey((x, y + FQ2.one(), z))
+        return (contributor.serialise_srs(), proof)
+
+
+# Updates the SRS, then replaces a power that the cheap checks do not look at
+class TamperingParticipant(LocalParticipant):
+    async def contribute(self, serialised_srs: SerialisedSRS) -> Tuple[SerialisedSRS, UpdateProof]:
+        updated_srs, proof = await super().contribute(serialised_srs)
+        updated_srs.g1_points[3] = g1_to_hex_str(G1Generator)
+        return (updated_srs, proof)
+
+
+# Drops the connection before contributing
+class DisconnectingParticipant(Participant):
+    def __init__(self, name: str):
+        self.name = name
+
+    async def contribute(self, serialised_srs: SerialisedSRS) -> Tuple[SerialisedSRS, UpdateProof]:
+        raise ConnectionResetError()
+
+
+class TestCoordinatorService(unittest.TestCase):
+
+    def test_service(self):
+        """
+            Test that the service accepts valid contributions, rejects invalid ones,
+            disconnects participants that take too long or fail, and keeps accepting
+            participants while a contribution is being verified
+        """
+        parameters = SRSParameters(4, 2)
+        starting_srs = SRS(parameters)
+
+        # The service is created outside of the event loop that it runs on
+        service = CoordinatorService(starting_srs, deadline=1.0)
+
+        async def run_ceremony():
+            service.join(OffCurveParticipant("eve", parameters))
+            service.join(DisconnectingParticipant("dropped"))
+            service.join(LocalParticipant("alice", KeyPair(2), parameters))
+            service.join(DishonestParticipant("mallory"))
+            service.join(LocalParticipant(
+                "slow", KeyPair(3), parameters, delay=10.0))
+
+            running = asyncio.create_task(service.run())
+            # Joining does not wait for the participants ahead in the queue
+            while len(service.history) == 0:
+                await asyncio.sleep(0.01)
+            service.join(LocalParticipant("bob", KeyPair(4), parameters))
+            service.stop()
+            await running
+
+        asyncio.run(run_ceremony())
+
+        self.assertEqual(service.history, [("eve", REJECTED), ("dropped", REJECTED), (
+            "alice", ACCEPTED), ("mallory", REJECTED), ("slow", TIMED_OUT), ("bob", ACCEPTED)])
+        self.assertEqual(service.metrics.num_turns(), 6)
+        self.assertEqual(service.metrics.rejected_stages, {
+                         STAGE_PROOF_POINTS: 1, PARTICIPANT_ERROR: 1, STAGE_DEGREE_1: 1})
+        self.assertGreater(service.metrics.throughput(), 0)
+
+        verifier = Verifier(parameters, starting_srs.serialise(),
+                            service.serialise_srs(), service.coordinator.update_proofs)
+        self.assertTrue(verifier.verify_ceremony())
+
+    def test_optimistic_service(self):
+        """
+            Test that an optimistic service accepts a contribution that only fails the full checks,
+            and that the background audit drops it along with the contributions made on top of it
+        """
+        parameters = SRSParameters(4, 2)
+        starting_srs = SRS(parameters)
+        service = CoordinatorService(
+            starting_srs, deadline=10.0, num_workers=2, optimistic=True, audit_batch_size=2)
+
+        async def run_ceremony():
+            service.join(LocalParticipant("alice", KeyPair(2), parameters))
+            service.join(TamperingParticipant(
+                "mallory", KeyPair(3), parameters))
+            service.join(LocalParticipant("bob", KeyPair(4), parameters))
+            service.join(LocalParticipant("carol", KeyPair(5), parameters))
+            service.stop()
+            await service.run()
+
+        asyncio.run(run_ceremony())
+
+        self.assertEqual(service.history[:2], [
+                         ("alice", ACCEPTED), ("mallory", ACCEPTED)])
+        self.assertGreaterEqual(service.metrics.num_dropped, 1)
+        self.assertEqual(service.coordinator.num_audited,
+                         len(service.coordinator.update_proofs))
+        self.assertEqual(service.coordinator.unaudited_SRS, [])
+        self.assertEqual(service.coordinator.num_rollbacks, 1)
+        self.assertGreaterEqual(service.metrics.num_audits, 1)
+
+        # Alice's contribution was kept, and every contribution that was kept is correct
+        self.assertEqual(service.coordinator.update_proofs[0].public_key,
+                         KeyPair(2).public_key)
+        self.assertIsNone(service.coordinator.update_proof_index.find(
+            KeyPair(3).public_key))
+        verifier = Verifier(parameters, starting_srs.serialise(),
+                            service.serialise_srs(), service.coordinator.update_proofs)
+        self.assertTrue(verifier.verify_ceremony())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Opt-in counters and timing spans for finding out where the time of a contribution goes.
+#
+#   with instrument() as recorder:
+#       update_transcript(transcript, secrets)
+#   print(recorder.to_json())
+#
+# The crypto operations in `bls.py` call `count`, and the phases of the actors call `span`.
+# When no recorder is active, both return after checking a single module-level variable,
+# so the instrumentation costs nothing next to the operations that it counts.
+#
+# Work done on the worker processes in `parallel.py` is not recorded.
+
+# The names of the counters in `bls.py`
+PAIRINGS = "pairings"
+FINAL_EXPONENTIATIONS = "final_exponentiations"
+G1_SCALAR_MULTIPLICATIONS = "g1_scalar_multiplications"
+G2_SCALAR_MULTIPLICATIONS = "g2_scalar_multiplications"
+MULTI_SCALAR_MULTIPLICATION_POINTS = "multi_scalar_multiplication_points"
+G1_DECOMPRESSIONS = "g1_decompressions"
+G2_DECOMPRESSIONS = "g2_decompressions"
+SUBGROUP_CHECKS = "subgroup_checks"
+BATCH_SUBGROUP_CHECK_POINTS = "batch_subgroup_check_points"
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    # The number of spans that were open when this span started
+    depth: int
+    # Seconds from the start of the recording to the start of the span
+    start: float
+    seconds: float
+
+
+# Called with each span once it has finished
+SpanCallback = Callable[[SpanRecord], None]
+
+
+class Recorder:
+    def __init__(self, callback: Optional[SpanCallback] = None):
+        self.callback = callback
+        self.counters: Dict[str, int] = {}
+        # The spans in the order that they finished
+        self.spans: List[SpanRecord] = []
+        self.depth = 0
+        self.start = time.perf_counter()
+
+    def count(self, name: str, amount: int):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish_span(self, span: SpanRecord):
+        self.spans.append(span)
+        if self.callback is not None:
+            self.callback(span)
+
+    # The total time and number of calls of each span, by name
+    def totals(self) -> Dict[str, dict]:
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(span.name, {"count": 0, "seconds": 0.0})
+            total["count"] += 1
+            total["seconds"] += span.seconds
+        return totals
+
+    def report(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "totals": self.totals(),
+            "spans": [asdict(span) for span in self.spans],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+
+
+class _Span:
+    def __init__(self, recorder: Recorder, name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.depth = self.recorder.depth
+        self.recorder.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.recorder.depth -= 1
+        self.recorder.finish_span(SpanRecord(
+            self.name, self.depth, self.start - self.recorder.start, end - self.start))
+        return False
+
+
+# The recorder that `count` and `span` report to, if any
+_active_recorder: Optional[Recorder] = None
+
+# Returned by `span` when no recorder is active
+_NO_SPAN = nullcontext()
+
+
+# Records the counters and spans of everything run inside the context.
+# Recorders can be nested; the innermost one receives the data.
+@contextmanager
+def instrument(callback: Optional[SpanCallback] = None) -> Iterator[Recorder]:
+    global _active_recorder
+    previous_recorder = _active_recorder
+    recorder = Recorder(callback)
+    _active_recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _active_recorder = previous_recorder
+
+
+def count(name: str, amount: int = 1):
+    if _active_recorder is not None:
+        _active_recorder.count(name, amount)
+
+
+# Times the code inside the returned context manager
+def span(name: str):
+    if _active_recorder is None:
+        return _NO_SPAN
+    return _Span(_active_recorder, name)
@@ -0,0 +1,71 @@
+import json
+import unittest
+from actors import Contributor
+from bls import G1Generator, G2Generator, PrivateKey, multiply_g1, pairing_check
+from instrumentation import (FINAL_EXPONENTIATIONS, G1_DECOMPRESSIONS, G1_SCALAR_MULTIPLICATIONS, G2_DECOMPRESSIONS, PAIRINGS, instrument,
+                             span)
+from keypair import KeyPair
+from srs import SRS, SRSParameters
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_counters(self):
+        """
+            Checks that the crypto operations are counted inside `instrument`
+            and that nothing is recorded outside of it
+        """
+        with instrument() as recorder:
+            point = multiply_g1(G1Generator, PrivateKey(5))
+            pairing_check([[point, G2Generator], [
+                          G1Generator, G2Generator]])
+
+        self.assertEqual(recorder.counters[G1_SCALAR_MULTIPLICATIONS], 1)
+        self.assertEqual(recorder.counters[PAIRINGS], 2)
+        self.assertEqual(recorder.counters[FINAL_EXPONENTIATIONS], 1)
+
+        multiply_g1(G1Generator, PrivateKey(5))
+        self.assertEqual(recorder.counters[G1_SCALAR_MULTIPLICATIONS], 1)
+
+    def test_spans(self):
+        """
+            Checks that nested spans record their depth, are passed to the callback
+            as they finish and that the report can be written as JSON
+        """
+        finished = []
+        with instrument(finished.append) as recorder:
+            with span("outer"):
+                with span("inner"):
+                    pass
+                with span("inner"):
+                    pass
+
+        self.assertEqual([(record.name, record.depth) for record in recorder.spans], [
+                         ("inner", 1), ("inner", 1), ("outer", 0)])
+        self.assertEqual(finished, recorder.spans)
+        self.assertEqual(recorder.totals()["inner"]["count"], 2)
+
+        report = json.loads(recorder.to_json())
+        self.assertEqual(len(report["spans"]), 3)
+
+    def test_contributor_phases(self):
+        """
+            Checks that the phases of a contribution are recorded
+        """
+        params = SRSParameters(4, 2)
+        serialised_srs = SRS(params).serialise()
+
+        with instrument() as recorder:
+            contributor = Contributor(KeyPair(0x1234), params, serialised_srs)
+            contributor.update_srs()
+            contributor.serialise_srs()
+
+        totals = recorder.totals()
+        for phase in ["contributor.deserialise", "contributor.copy", "contributor.update", "contributor.serialise"]:
+            self.assertEqual(totals[phase]["count"], 1)
+        self.assertEqual(recorder.counters[G1_DECOMPRESSIONS], 4)
+        self.assertEqual(recorder.counters[G2_DECOMPRESSIONS], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
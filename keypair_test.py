@@ -34,6 +34,19 @@ class TestKeyPair(unittest.TestCase):
         self.assertEqual(key_from_hex.private_key, key_from_int.private_key)
         self.assertEqual(key_from_hex.public_key, key_from_int.public_key)
 
+    def test_powers_match_pow_i(self):
+        """
+            Checks that computing the powers of the private key incrementally
+            gives the same result as raising it to each power separately
+        """
+        for secret in [0, 1, 2, 0x123456]:
+            private_key = KeyPair(secret).private_key
+            powers = private_key.powers(10)
+
+            self.assertEqual(len(powers), 10)
+            for i, power in enumerate(powers):
+                self.assertEqual(power, private_key.pow_i(i).scalar)
+
 
 if __name__ == '__main__':
     unittest.main()
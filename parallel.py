@@ -0,0 +1,153 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from bls import COMPRESSED, FQ, FQ2, G1Point, G2Point, compressed_bytes_to_g1, compressed_bytes_to_g2, hex_str_to_g1, hex_str_to_g2, multiply_g1_scalar, multiply_g2_scalar
+from common import hex_str
+
+# Points are sent to and from the worker processes as tuples of integers
+# instead of pickled FQ objects. These are the projective coordinates of the point,
+# so no field inversion is needed to encode or decode a point.
+EncodedG1Point = Tuple[int, int, int]
+EncodedG2Point = Tuple[int, int, int, int, int, int]
+
+# Each worker is given several chunks, so that a slow chunk does not hold up the whole pool
+CHUNKS_PER_WORKER = 4
+
+# Each function below takes an optional `executor`. Starting a pool of processes takes a while
+# and each worker has to import the modules again, so a caller that deserialises or updates
+# many SRSs, such as a coordinator, should pass in a pool that lives as long as it does.
+# `num_workers` should then be the number of workers in that pool.
+
+
+def encode_g1(point: G1Point) -> EncodedG1Point:
+    x, y, z = point
+    return (x.n, y.n, z.n)
+
+
+def decode_g1(encoded: EncodedG1Point) -> G1Point:
+    x, y, z = encoded
+    return (FQ(x), FQ(y), FQ(z))
+
+
+def encode_g2(point: G2Point) -> EncodedG2Point:
+    x, y, z = point
+    return x.coeffs + y.coeffs + z.coeffs
+
+
+def decode_g2(encoded: EncodedG2Point) -> G2Point:
+    return (FQ2(encoded[0:2]), FQ2(encoded[2:4]), FQ2(encoded[4:6]))
+
+
+# Yields `executor` if one is given, otherwise a pool of `num_workers` processes that is shut down afterwards
+@contextmanager
+def worker_pool(num_workers: int, executor: Optional[Executor] = None) -> Iterator[Executor]:
+    if executor is not None:
+        yield executor
+        return
+    with ProcessPoolExecutor(num_workers) as pool:
+        yield pool
+
+
+# Splits `num_items` into at most `num_chunks` contiguous ranges of similar size
+def chunk_ranges(num_items: int, num_chunks: int) -> List[range]:
+    num_chunks = max(1, min(num_chunks, num_items))
+    chunk_size, remainder = divmod(num_items, num_chunks)
+
+    ranges = []
+    start = 0
+    for i in range(num_chunks):
+        end = start + chunk_size + (1 if i < remainder else 0)
+        ranges.append(range(start, end))
+        start = end
+    return ranges
+
+
+def _update_g1_chunk(encoded_points: List[EncodedG1Point], scalars: List[int]) -> List[EncodedG1Point]:
+    return [encode_g1(multiply_g1_scalar(decode_g1(point), scalar))
+            for point, scalar in zip(encoded_points, scalars)]
+
+
+def _update_g2_chunk(encoded_points: List[EncodedG2Point], scalars: List[int]) -> List[EncodedG2Point]:
+    return [encode_g2(multiply_g2_scalar(decode_g2(point), scalar))
+            for point, scalar in zip(encoded_points, scalars)]
+
+
+# Multiplies the i'th G1 point by the i'th power, and the i'th G2 point by the i'th power,
+# splitting the work across `num_workers` processes.
+# The result is identical to multiplying each point in this process.
+def update_points_parallel(g1_points: List[G1Point], g2_points: List[G2Point], powers: List[int], num_workers: int, executor: Optional[Executor] = None) -> Tuple[List[G1Point], List[G2Point]]:
+    with worker_pool(num_workers, executor) as executor:
+        g1_futures = _submit_chunks(executor, _update_g1_chunk, encode_g1,
+                                    g1_points, powers, num_workers)
+        g2_futures = _submit_chunks(executor, _update_g2_chunk, encode_g2,
+                                    g2_points, powers, num_workers)
+
+        updated_g1_points = [decode_g1(point)
+                             for future in g1_futures for point in future.result()]
+        updated_g2_points = [decode_g2(point)
+                             for future in g2_futures for point in future.result()]
+
+    return (updated_g1_points, updated_g2_points)
+
+
+def _submit_chunks(executor: Executor, update_chunk, encode, points, powers: List[int], num_workers: int):
+    futures = []
+    for indices in chunk_ranges(len(points), num_workers * CHUNKS_PER_WORKER):
+        encoded_points = [encode(points[i]) for i in indices]
+        futures.append(executor.submit(
+            update_chunk, encoded_points, powers[indices.start:indices.stop]))
+    return futures
+
+
+def _decompress_g1_chunk(hex_strs: List[hex_str], encoding: str) -> List[EncodedG1Point]:
+    return [encode_g1(hex_str_to_g1(string, subgroup_check=False, encoding=encoding)) for string in hex_strs]
+
+
+def _decompress_g2_chunk(hex_strs: List[hex_str], encoding: str) -> List[EncodedG2Point]:
+    return [encode_g2(hex_str_to_g2(string, subgroup_check=False, encoding=encoding)) for string in hex_strs]
+
+
+# Deserialises the G1 and G2 points in the given encoding, splitting the work across `num_workers` processes.
+# Like the serial path in `SRS.deserialise`, this checks that the points are on the curve
+# but does not check that they are in the subgroup.
+def decompress_points_parallel(g1_powers: List[hex_str], g2_powers: List[hex_str], num_workers: int, encoding: str = COMPRESSED, executor: Optional[Executor] = None) -> Tuple[List[G1Point], List[G2Point]]:
+    with worker_pool(num_workers, executor) as executor:
+        g1_futures = [executor.submit(_decompress_g1_chunk, g1_powers[indices.start:indices.stop], encoding)
+                      for indices in chunk_ranges(len(g1_powers), num_workers * CHUNKS_PER_WORKER)]
+        g2_futures = [executor.submit(_decompress_g2_chunk, g2_powers[indices.start:indices.stop], encoding)
+                      for indices in chunk_ranges(len(g2_powers), num_workers * CHUNKS_PER_WORKER)]
+
+        g1_points = [decode_g1(point)
+                     for future in g1_futures for point in future.result()]
+        g2_points = [decode_g2(point)
+                     for future in g2_futures for point in future.result()]
+
+    return (g1_points, g2_points)
+
+
+def _decompress_g1_bytes_chunk(serialised_points: bytes) -> List[EncodedG1Point]:
+    return [encode_g1(compressed_bytes_to_g1(serialised_points[i: i + 48], subgroup_check=False))
+            for i in range(0, len(serialised_points), 48)]
+
+
+def _decompress_g2_bytes_chunk(serialised_points: bytes) -> List[EncodedG2Point]:
+    return [encode_g2(compressed_bytes_to_g2(serialised_points[i: i + 96], subgroup_check=False))
+            for i in range(0, len(serialised_points), 96)]
+
+
+# Same as `decompress_points_parallel`, for compressed points that are stored back to back.
+# Each worker is sent a single bytes object per chunk.
+def decompress_bytes_parallel(g1_bytes: bytes, g2_bytes: bytes, num_workers: int, executor: Optional[Executor] = None) -> Tuple[List[G1Point], List[G2Point]]:
+    with worker_pool(num_workers, executor) as executor:
+        g1_futures = [executor.submit(_decompress_g1_bytes_chunk, bytes(g1_bytes[indices.start * 48:indices.stop * 48]))
+                      for indices in chunk_ranges(len(g1_bytes) // 48, num_workers * CHUNKS_PER_WORKER)]
+        g2_futures = [executor.submit(_decompress_g2_bytes_chunk, bytes(g2_bytes[indices.start * 96:indices.stop * 96]))
+                      for indices in chunk_ranges(len(g2_bytes) // 96, num_workers * CHUNKS_PER_WORKER)]
+
+        g1_points = [decode_g1(point)
+                     for future in g1_futures for point in future.result()]
+        g2_points = [decode_g2(point)
+                     for future in g2_futures for point in future.result()]
+
+    return (g1_points, g2_points)
@@ -0,0 +1,170 @@
+from typing import Iterable, Iterator, Union
+
+from bls import FQ, FQ2, G1Point, G2Point
+
+# Compact storage for the points of an SRS.
+#
+# A G1Point is a tuple of three FQ objects, each wrapping its own int, so a list of points
+# costs several hundred bytes per point on top of the list itself. These containers pack the
+# projective coordinates of the points into bytearrays instead, 48 bytes per field element.
+# The points are converted back to py_ecc tuples when they are read, which is where the
+# arithmetic starts, and packed again when they are written.
+#
+# The coordinates are stored as they are, without normalising the point,
+# so no field inversion is needed to pack or unpack a point.
+#
+# The bytearrays hold `CHUNK_SIZE` points each and are shared between copies.
+# A copy only duplicates a chunk when one of its points is written,
+# so copying an SRS that is about to be updated costs one list of chunks.
+
+# The size of a field element in bytes
+COORDINATE_SIZE = 48
+
+# The number of points in each chunk
+CHUNK_SIZE = 256
+
+
+def _pack_g1(point: G1Point) -> bytes:
+    x, y, z = point
+    return x.n.to_bytes(COORDINATE_SIZE, "big") + y.n.to_bytes(COORDINATE_SIZE, "big") + z.n.to_bytes(COORDINATE_SIZE, "big")
+
+
+def _unpack_g1(data: bytes, offset: int) -> G1Point:
+    return (FQ(int.from_bytes(data[offset: offset + 48], "big")),
+            FQ(int.from_bytes(data[offset + 48: offset + 96], "big")),
+            FQ(int.from_bytes(data[offset + 96: offset + 144], "big")))
+
+
+def _pack_g2(point: G2Point) -> bytes:
+    return b"".join(coeff.to_bytes(COORDINATE_SIZE, "big") for coordinate in point for coeff in coordinate.coeffs)
+
+
+def _unpack_g2(data: bytes, offset: int) -> G2Point:
+    coeffs = [int.from_bytes(data[start: start + COORDINATE_SIZE], "big")
+              for start in range(offset, offset + 6 * COORDINATE_SIZE, COORDINATE_SIZE)]
+    return (FQ2(coeffs[0:2]), FQ2(coeffs[2:4]), FQ2(coeffs[4:6]))
+
+
+# A list-like sequence of points, backed by copy-on-write chunks.
+# Reading an index returns a new tuple, so changing the points
+# must be done by assigning to an index, as with a list of tuples.
+class PackedPoints:
+    __slots__ = ("__chunks", "__owned", "__num_points")
+
+    # The number of bytes that each point takes, set by the subclasses
+    point_size = 0
+
+    # Passing another container of the same type makes a copy that shares its chunks
+    def __init__(self, points: Iterable = ()):
+        if isinstance(points, type(self)):
+            self.__chunks = list(points.__chunks)
+            self.__num_points = points.__num_points
+            # Neither container may write to the shared chunks from now on
+            self.__owned = [False] * len(self.__chunks)
+            points.__owned = [False] * len(self.__chunks)
+            return
+
+        self.__chunks = []
+        self.__owned = []
+        self.__num_points = 0
+        for point in points:
+            self.append(point)
+
+    # Returns a sequence of `num_points` copies of `point`.
+    # Every full chunk is the same bytearray until it is written to.
+    @classmethod
+    def repeat(cls, point, num_points: int):
+        points = cls()
+        num_chunks, remainder = divmod(num_points, CHUNK_SIZE)
+        packed = cls.pack(point)
+        full_chunk = bytearray(packed * CHUNK_SIZE)
+        points.__chunks = [full_chunk] * num_chunks
+        if remainder > 0:
+            points.__chunks.append(bytearray(packed * remainder))
+        points.__owned = [False] * len(points.__chunks)
+        points.__num_points = num_points
+        return points
+
+    def __len__(self) -> int:
+        return self.__num_points
+
+    # Slices return a list of points, like `list(points)[index]`
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.__num_points))]
+        chunk, offset = self.__locate(index)
+        return self.unpack(self.__chunks[chunk], offset)
+
+    # Slices can only be assigned the same number of points that they select
+    def __setitem__(self, index: Union[int, slice], value):
+        if isinstance(index, slice):
+            indices = range(*index.indices(self.__num_points))
+            value = list(value)
+            assert len(value) == len(indices)
+            for i, point in zip(indices, value):
+                self[i] = point
+            return
+        chunk, offset = self.__locate(index)
+        self.__writable_chunk(chunk)[offset: offset +
+                                     self.point_size] = self.pack(value)
+
+    def __iter__(self) -> Iterator:
+        for chunk in self.__chunks:
+            for offset in range(0, len(chunk), self.point_size):
+                yield self.unpack(chunk, offset)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, type(self)):
+            # Every chunk is full apart from the last one, so equal sequences have equal chunks
+            return self.__chunks == other.__chunks
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return "%s(%d points)" % (type(self).__name__, self.__num_points)
+
+    def append(self, point):
+        if self.__num_points % CHUNK_SIZE == 0:
+            self.__chunks.append(bytearray())
+            self.__owned.append(True)
+        self.__writable_chunk(len(self.__chunks) - 1).extend(self.pack(point))
+        self.__num_points += 1
+
+    # Returns a copy that shares the chunks of this container until either of them is written to
+    def copy(self):
+        return type(self)(self)
+
+    # The total size of the packed coordinates in bytes, counting shared chunks
+    def num_bytes(self) -> int:
+        return self.__num_points * self.point_size
+
+    # Returns the chunk and the byte offset within it of the point at `index`
+    def __locate(self, index: int):
+        if index < 0:
+            index += self.__num_points
+        if index < 0 or index >= self.__num_points:
+            raise IndexError("point index out of range")
+        chunk, position = divmod(index, CHUNK_SIZE)
+        return (chunk, position * self.point_size)
+
+    # Duplicates the chunk if it is shared, before it is written to
+    def __writable_chunk(self, chunk: int) -> bytearray:
+        if self.__owned[chunk] == False:
+            self.__chunks[chunk] = bytearray(self.__chunks[chunk])
+            self.__owned[chunk] = True
+        return self.__chunks[chunk]
+
+
+class G1Points(PackedPoints):
+    __slots__ = ()
+    point_size = 3 * COORDINATE_SIZE
+    pack = staticmethod(_pack_g1)
+    unpack = staticmethod(_unpack_g1)
+
+
+class G2Points(PackedPoints):
+    __slots__ = ()
+    point_size = 6 * COORDINATE_SIZE
+    pack = staticmethod(_pack_g2)
+    unpack = staticmethod(_unpack_g2)
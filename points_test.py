@@ -0,0 +1,66 @@
+import unittest
+from bls import G1Generator, G2Generator, PrivateKey, multiply_g1, multiply_g2
+from points import CHUNK_SIZE, G1Points, G2Points
+
+
+class TestPoints(unittest.TestCase):
+
+    def test_packed_points_behave_like_lists(self):
+        """
+            Checks that the packed containers return the points they were given,
+            and that indexing, slicing and assignment match a list of points
+        """
+        for (packed_type, generator, multiply) in [(G1Points, G1Generator, multiply_g1), (G2Points, G2Generator, multiply_g2)]:
+            points = [multiply(generator, PrivateKey(i + 1)) for i in range(5)]
+            packed = packed_type(points)
+
+            self.assertEqual(len(packed), 5)
+            self.assertEqual(list(packed), points)
+            self.assertEqual(packed[-1], points[-1])
+            self.assertEqual(packed[1:3], points[1:3])
+
+            packed[0] = points[4]
+            points[0] = points[4]
+            packed[1:3] = points[2:4]
+            points[1:3] = points[2:4]
+            self.assertEqual(packed, points)
+
+            # Writing to a copy does not change the original, and the other way around
+            copy = packed.copy()
+            copy[0] = generator
+            self.assertEqual(packed, points)
+            packed[1] = generator
+            self.assertEqual(copy[1], points[1])
+
+            with self.assertRaises(IndexError):
+                packed[5]
+
+            self.assertEqual(list(packed_type.repeat(generator, 3)), [
+                             generator] * 3)
+
+    def test_copies_share_chunks_until_written(self):
+        """
+            Checks that the points of a copy spanning several chunks
+            are independent of the original once either is written to
+        """
+        num_points = 2 * CHUNK_SIZE + 3
+        points = G1Points.repeat(G1Generator, num_points)
+        copy = points.copy()
+
+        point = multiply_g1(G1Generator, PrivateKey(7))
+        for i in [0, CHUNK_SIZE, num_points - 1]:
+            copy[i] = point
+        points.append(point)
+
+        self.assertEqual(len(points), num_points + 1)
+        self.assertEqual(len(copy), num_points)
+        self.assertEqual([points[i] for i in [0, CHUNK_SIZE, num_points - 1]], [
+                         G1Generator] * 3)
+        self.assertEqual([copy[i] for i in [0, CHUNK_SIZE, num_points - 1]], [
+                         point] * 3)
+        self.assertEqual(points[num_points], point)
+        self.assertEqual(copy[1], G1Generator)
+
+
+if __name__ == '__main__':
+    unittest.main()
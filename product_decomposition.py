@@ -1,9 +1,14 @@
 from dataclasses import dataclass
-from typing import List
+from secrets import randbits
+from typing import List, Optional
 
-from bls import G1Point, G2Point, gt_eq, is_identity, pairing, G2Generator
+from bls import G1Point, G2Point, batch_is_in_subgroup, is_identity, lincomb, multiply_g1_glv, neg_g1, pairing_check, prepared_g2_generator
 from common import pairwise
 
+# The batched verification combines the links using random scalars of this size.
+# A proof with a bad link will pass the batched verification with probability at most 2^-128
+BATCH_VERIFICATION_SCALAR_BITS = 128
+
 
 # A product decomposition proof is capable of proving that one knows the
 # product decomposition for a particular number without revealing said decomposition
@@ -32,9 +37,63 @@ class ProductDecompositionProof:
             prev_running_product = pair[0]
             next_running_product = pair[1]
 
-            p1 = pairing(next_running_product, G2Generator)
-            p2 = pairing(prev_running_product, witness)
-
-            if gt_eq(p1, p2) == False:
+            # e(next, G2) == e(prev, witness)
+            if pairing_check([(next_running_product, prepared_g2_generator()), (neg_g1(prev_running_product), witness)]) == False:
                 return False
         return True
+
+    # Verifies every link with a single multi-pairing instead of two pairings per link.
+    # See `find_invalid_link`
+    def verify_batched(self) -> bool:
+        return self.find_invalid_link() is None
+
+    # Returns the index of the first link that does not verify, or None if every link verifies.
+    #
+    # The links are checked at once using a random linear combination of the link equations:
+    #   e(sum r_i * next_i, G2) * prod e(-r_i * prev_i, witness_i) == 1
+    # This is only sound if every point is in the prime order subgroup, which is checked first.
+    # If the combination does not verify, the first bad link is found by bisection.
+    def find_invalid_link(self) -> Optional[int]:
+        num_links = len(self.witnesses)
+        if num_links == 0:
+            return None
+
+        # The i'th product is the next product of link i-1 and the previous product of link i
+        products_result = batch_is_in_subgroup(self.running_product)
+        witnesses_result = batch_is_in_subgroup(self.witnesses)
+        if products_result.passed == False or witnesses_result.passed == False:
+            failing_links = []
+            if products_result.passed == False:
+                failing_links.append(max(products_result.failing_index - 1, 0))
+            if witnesses_result.passed == False:
+                failing_links.append(witnesses_result.failing_index)
+            return min(failing_links)
+
+        if self.__links_verify(0, num_links):
+            return None
+
+        # `[start, end)` always contains a bad link
+        start = 0
+        end = num_links
+        while end - start > 1:
+            middle = (start + end) // 2
+            if self.__links_verify(start, middle) == False:
+                end = middle
+            else:
+                start = middle
+        return start
+
+    # Checks links `start` to `end - 1` with a single multi-pairing.
+    # Note: this assumes that the points are in the prime order subgroup.
+    def __links_verify(self, start: int, end: int) -> bool:
+        scalars = [randbits(BATCH_VERIFICATION_SCALAR_BITS)
+                   for _ in range(end - start)]
+
+        next_products = self.running_product[start + 1: end + 1]
+        pairs = [(lincomb(next_products, scalars), prepared_g2_generator())]
+        for i, scalar in zip(range(start, end), scalars):
+            prev_running_product = self.running_product[i]
+            pairs.append((neg_g1(multiply_g1_glv(
+                prev_running_product, scalar)), self.witnesses[i]))
+
+        return pairing_check(pairs)
@@ -59,6 +59,25 @@ class TestProductDecomp(unittest.TestCase):
 
         # We now want to verify that the final product is a decomposition of secrets that we know
         self.assertTrue(product_proof.verify())
+        self.assertTrue(product_proof.verify_batched())
+
+    def test_batched_verification_finds_bad_link(self):
+        """
+            Test that the batched verification agrees with verifying each link,
+            and finds the first link that does not verify
+        """
+        product_proof = ProductDecompositionProof(G1Generator)
+        for secret in [123, 456, 789, 1011, 1213]:
+            add_to_product(product_proof, PrivateKey(secret))
+
+        self.assertTrue(product_proof.verify_batched())
+        self.assertIsNone(product_proof.find_invalid_link())
+
+        product_proof.witnesses[2] = G2Generator
+        product_proof.witnesses[4] = G2Generator
+        self.assertFalse(product_proof.verify())
+        self.assertFalse(product_proof.verify_batched())
+        self.assertEqual(product_proof.find_invalid_link(), 2)
 
 
 if __name__ == '__main__':
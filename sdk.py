@@ -1,11 +1,15 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
-from actors import Contributor, Verifier
-from bls import PublicKey
+from typing import List, Optional, TextIO, Tuple
+from actors import Contributor, StreamingContributor, Verifier
+from bls import COMPRESSED, PublicKey
 from keypair import KeyPair
 from srs import SRS, SRSParameters, SerialisedSRS
-from srs_updates import UpdateProof, UpdateProofs
+from srs_updates import UpdateProof, UpdateProofIndex, UpdateProofs
 from common import hex_str
+from instrumentation import span
+from transcript_stream import (DEFAULT_CHUNK_SIZE, ENCODING, G1_POINTS, G2_POINTS, NUM_G1_POINTS, NUM_G2_POINTS, TranscriptWriter,
+                               read_transcript_events)
 
 
 # We are running four small ceremonies each of a different size
@@ -37,15 +41,25 @@ class Transcript:
     sub_ceremonies: Tuple[SerialisedSRS,
                           SerialisedSRS, SerialisedSRS, SerialisedSRS]
 
+    # The serialised points are immutable strings, so each sub-ceremony is copied
+    # without copying its points, see `SerialisedSRS.copy`
     def copy(self):
-        from copy import deepcopy
-        return deepcopy(self)
+        return Transcript([ceremony.copy() for ceremony in self.sub_ceremonies])
 
 
 # Since we changed the specs, the transcript does not contain the update proofs, so we return it when we
 # update the transcript
-def update_transcript(transcript: Transcript, secrets: List[hex_str]) -> Tuple[Transcript, UpdateProofs]:
-    assert len(secrets) == NUM_OF_CEREMONIES
+#
+# `num_workers` is the number of processes used to decompress and update each SRS
+# `params` are the expected sizes of the SRS's, smaller sizes are used for testing and benchmarking
+# `executor` is a pool of `num_workers` processes to use. If it is None, one pool is started
+# and shared by every SRS, instead of a pool for each SRS and step.
+def update_transcript(transcript: Transcript, secrets: List[hex_str], num_workers: int = 1, params: List[SRSParameters] = TRANSCRIPT_PARAMS, executor: Optional[Executor] = None) -> Tuple[Transcript, UpdateProofs]:
+    assert len(secrets) == len(params)
+
+    if num_workers > 1 and executor is None:
+        with ProcessPoolExecutor(num_workers) as executor:
+            return update_transcript(transcript, secrets, num_workers, params, executor)
 
     # Create a KeyPair for each srs using the provided secrets/randomness
     keypairs: List[KeyPair] = []
@@ -56,75 +70,201 @@ def update_transcript(transcript: Transcript, secrets: List[hex_str]) -> Tuple[T
 
     # Emulate four Contributors, one for each srs
     contributors: List[Contributor] = []
-    for (keypair, ceremony, params) in zip(keypairs, transcript.sub_ceremonies, TRANSCRIPT_PARAMS):
+    with span("sdk.deserialise"):
+        for (keypair, ceremony, param) in zip(keypairs, transcript.sub_ceremonies, params):
 
-        assert ceremony.num_g1_points == params.num_g1_points_needed
-        assert ceremony.num_g2_points == params.num_g2_points_needed
+            assert ceremony.num_g1_points == param.num_g1_points_needed
+            assert ceremony.num_g2_points == param.num_g2_points_needed
 
-        contributor = Contributor(keypair, params, ceremony)
-        contributors.append(contributor)
+            contributor = Contributor(
+                keypair, param, ceremony, num_workers, executor)
+            contributors.append(contributor)
 
-    # Update SRS's with contribution and return the update proofs
+    # Update SRS's with contribution and return the update proofs.
+    # Each SRS is subgroup checked before it is updated, see `Contributor.update_srs`,
+    # and a ValueError is raised if any of them fails the checks
     update_proofs: List[UpdateProof] = []
-    for contributor in contributors:
-        proof = contributor.update_srs()
-        contributor.keypair.destroy()
-        update_proofs.append(proof)
-
-    # # Perform checks -- Since we are using optimistic contribution.
-    # # The checks that the contributor needs to do are done after they have sent the
-    # # srs to the coordinator
-    # for contributor in contributors:
-    #     if contributor.all_elements_in_correct_subgroup() == False:
-    #         return None
+    with span("sdk.update"):
+        for contributor in contributors:
+            try:
+                proof = contributor.update_srs(num_workers, executor)
+            except ValueError:
+                for keypair in keypairs:
+                    keypair.destroy()
+                raise
+            contributor.keypair.destroy()
+            update_proofs.append(proof)
 
     # Create new transcript
     list_of_srs = []
-    for contributor in contributors:
-        list_of_srs.append(contributor.serialise_srs())
+    with span("sdk.serialise"):
+        for contributor in contributors:
+            list_of_srs.append(contributor.serialise_srs())
 
     return (Transcript(list_of_srs), update_proofs)
 
 
-def transcript_subgroup_check(transcript: Transcript) -> bool:
+# Writes the transcript as JSON one point at a time, see `transcript_stream`
+def write_transcript_json(transcript: Transcript, file: TextIO):
+    writer = TranscriptWriter(file)
     for ceremony in transcript.sub_ceremonies:
+        writer.begin_sub_ceremony()
+        writer.write_integer(NUM_G1_POINTS, ceremony.num_g1_points)
+        writer.write_integer(NUM_G2_POINTS, ceremony.num_g2_points)
+        # The encoding is written before the points, so that a reader
+        # knows how to deserialise them as they are parsed
+        writer.write_string(ENCODING, ceremony.encoding)
+        writer.write_points(G1_POINTS, ceremony.g1_points)
+        writer.write_points(G2_POINTS, ceremony.g2_points)
+    writer.close()
+
+
+def read_transcript_json(file: TextIO) -> Transcript:
+    ceremonies: List[dict] = []
+    for (index, key, value) in read_transcript_events(file):
+        if index == len(ceremonies):
+            ceremonies.append(
+                {NUM_G1_POINTS: 0, NUM_G2_POINTS: 0, G1_POINTS: [], G2_POINTS: [], ENCODING: COMPRESSED})
+        if key == G1_POINTS or key == G2_POINTS:
+            ceremonies[index][key].extend(value)
+        else:
+            ceremonies[index][key] = value
+
+    return Transcript([SerialisedSRS(**ceremony) for ceremony in ceremonies])
+
+
+# Same as `update_transcript`, except that the transcript is read from `input_file`
+# and the updated transcript is written to `output_file` as they are parsed.
+# At most `chunk_size` points of the transcript are held in memory at once.
+#
+# Unlike `update_transcript`, the subgroup checks on the received transcript are done
+# as the points are decompressed. If they fail, the update stops at the window that failed,
+# before it is updated or written, and a ValueError is raised as in `update_transcript`.
+# The output is then left as an unfinished transcript that cannot be parsed.
+def update_transcript_stream(input_file: TextIO, output_file: TextIO, secrets: List[hex_str], params: List[SRSParameters] = TRANSCRIPT_PARAMS, chunk_size: int = DEFAULT_CHUNK_SIZE) -> UpdateProofs:
+    assert len(secrets) == len(params)
+
+    contributors = [StreamingContributor(KeyPair(secret), param)
+                    for (secret, param) in zip(secrets, params)]
+
+    try:
+        num_ceremonies = _update_transcript_events(
+            input_file, output_file, contributors, params, chunk_size)
+    except ValueError:
+        for contributor in contributors:
+            contributor.keypair.destroy()
+        raise
+
+    assert num_ceremonies == len(params)
+
+    update_proofs: List[UpdateProof] = []
+    for contributor in contributors:
+        update_proofs.append(contributor.update_proof())
+        contributor.keypair.destroy()
+
+    return update_proofs
+
+
+# Writes the updated transcript as it is read and returns the number of sub-ceremonies read.
+# Raises a ValueError if a window of points fails the subgroup checks, see `StreamingUpdate`
+def _update_transcript_events(input_file: TextIO, output_file: TextIO, contributors: List[StreamingContributor], params: List[SRSParameters], chunk_size: int) -> int:
+    writer = TranscriptWriter(output_file)
+    num_ceremonies = 0
+    for (index, key, value) in read_transcript_events(input_file, chunk_size):
+        assert index < len(params)
+        if index == num_ceremonies:
+            writer.begin_sub_ceremony()
+            num_ceremonies += 1
+
+        contributor = contributors[index]
+        if key == NUM_G1_POINTS:
+            assert value == params[index].num_g1_points_needed
+            writer.write_integer(key, value)
+        elif key == NUM_G2_POINTS:
+            assert value == params[index].num_g2_points_needed
+            writer.write_integer(key, value)
+        elif key == ENCODING:
+            # The streaming update only works on the published, compressed, transcript
+            assert value == COMPRESSED
+            writer.write_string(key, value)
+        elif key == G1_POINTS:
+            writer.write_points(key, contributor.g1_update.update(value))
+        elif key == G2_POINTS:
+            writer.write_points(key, contributor.g2_update.update(value))
+    writer.close()
+    return num_ceremonies
+
+
+def transcript_subgroup_check(transcript: Transcript, num_workers: int = 1, executor: Optional[Executor] = None) -> bool:
+    if num_workers > 1 and executor is None:
+        with ProcessPoolExecutor(num_workers) as executor:
+            return transcript_subgroup_check(transcript, num_workers, executor)
 
-        params = SRSParameters(ceremony.num_g1_powers, ceremony.num_g2_powers)
-        srs = SRS.deserialise(params, ceremony.powers_of_tau)
+    for ceremony in transcript.sub_ceremonies:
+
+        params = SRSParameters(ceremony.num_g1_points, ceremony.num_g2_points)
+        srs = SRS.deserialise(params, ceremony, num_workers, executor)
         if srs.subgroup_checks() == False:
             return False
 
     return True
 
 
-def verify_ceremonies(starting_transcript: Transcript, ending_transcript: Transcript, ceremonies_update_proofs: List[UpdateProofs]) -> bool:
+def verify_ceremonies(starting_transcript: Transcript, ending_transcript: Transcript, ceremonies_update_proofs: List[UpdateProofs], num_workers: int = 1, executor: Optional[Executor] = None) -> bool:
+    if num_workers > 1 and executor is None:
+        with ProcessPoolExecutor(num_workers) as executor:
+            return verify_ceremonies(starting_transcript, ending_transcript, ceremonies_update_proofs, num_workers, executor)
 
     for i in range(NUM_OF_CEREMONIES):
         starting_srs = starting_transcript.sub_ceremonies[i]
         ending_srs = ending_transcript.sub_ceremonies[i]
 
         update_proofs = ceremonies_update_proofs[i]
-        params = SRSParameters(starting_srs.num_g1_powers,
-                               starting_srs.num_g2_powers)
+        params = SRSParameters(starting_srs.num_g1_points,
+                               starting_srs.num_g2_points)
 
-        verifier = Verifier(params, starting_srs.powers_of_tau,
-                            ending_srs.powers_of_tau, update_proofs)
+        verifier = Verifier(params, starting_srs,
+                            ending_srs, update_proofs, num_workers, executor)
         if verifier.verify_ceremony() == False:
             return False
 
     return True
 
 
+# Builds an index of the public keys in the update proofs of each ceremony.
+# The indices can be built once when the update proofs are loaded, and then
+# passed to `find_contributions_no_verify` for every lookup
+def build_update_proof_indices(ceremony_update_proofs: List[UpdateProofs]) -> List[UpdateProofIndex]:
+    assert len(ceremony_update_proofs) == NUM_OF_CEREMONIES
+    return [UpdateProofIndex(proofs) for proofs in ceremony_update_proofs]
+
+
 # This function assumes that the srs has been verified
 # Note: The position _should_ be the same for a contributor across srs's.
 # We could stop once we find the position in one srs, however this is an unnecessary optimisation
-def find_contributions_no_verify(ceremony_update_proofs: List[UpdateProofs], pubkeys: List[PublicKey]) -> List[Optional[int]]:
+#
+# If `indices` is None, each list of update proofs is scanned for the public key.
+# Building the indices costs more than a single scan, so they are only worth it
+# when they are kept alongside the update proofs, see `build_update_proof_indices`
+def find_contributions_no_verify(ceremony_update_proofs: List[UpdateProofs], pubkeys: List[PublicKey], indices: Optional[List[UpdateProofIndex]] = None) -> List[Optional[int]]:
     assert len(ceremony_update_proofs) == len(pubkeys)
     assert len(ceremony_update_proofs) == NUM_OF_CEREMONIES
 
     positions = []
-    for (pubkey, proofs) in zip(pubkeys, ceremony_update_proofs):
-        position = Verifier.find_public_key_in_update_proofs(proofs, pubkey)
-        positions.append(position)
+    if indices is None:
+        for (pubkey, proofs) in zip(pubkeys, ceremony_update_proofs):
+            positions.append(
+                Verifier.find_public_key_in_update_proofs(proofs, pubkey))
+        return positions
+
+    for (pubkey, index) in zip(pubkeys, indices):
+        positions.append(index.find(pubkey))
 
     return positions
+
+
+# Finds the position of many contributions in each ceremony at once.
+# `pubkeys[i]` are the public keys to find in the i'th ceremony
+def find_many_contributions_no_verify(indices: List[UpdateProofIndex], pubkeys: List[List[PublicKey]]) -> List[List[Optional[int]]]:
+    assert len(indices) == len(pubkeys)
+    return [index.find_many(keys) for (index, keys) in zip(indices, pubkeys)]
@@ -1,18 +1,28 @@
 from __future__ import annotations
+from concurrent.futures import Executor
 from dataclasses import dataclass
-from typing import List, Tuple
-from copy import deepcopy
-
-from bls import (G1Point, G2Point, g1_eq, g1_to_hex_str, g2_to_hex_str, gt_eq, hex_str_to_g1, hex_str_to_g2, is_identity, is_in_g1, is_in_g2, is_in_subgroup,  multiply_g1, multiply_g2, pairing,
-                 G1Generator, G2Generator)
-from common import pairwise, hex_str
+from typing import Iterable, List, Optional, Tuple
+from secrets import randbits
+from time import perf_counter
+
+from bls import (COMPRESSED, UNCOMPRESSED, G1Point, G2Point, PrivateKey, SubgroupCheckResult, curve_order, batch_is_in_subgroup, g1_eq, g1_points_to_hex_strs, g2_points_to_hex_strs, compressed_bytes_to_g1, compressed_bytes_to_g2, hex_str_to_g1, hex_str_to_g2, is_identity, is_in_g1, is_in_g2, is_in_subgroup, lincomb, multiply_g1_scalar, multiply_g2_scalar, multiply_wnaf, neg_g1, pairing_check, PreparedG2,
+                 G1Generator, G2Generator, is_canonical_compressed_g1, is_canonical_compressed_g2)
+from common import bytes_from_hex, pairwise, hex_str
+from instrumentation import span
 from keypair import KeyPair
+from parallel import decompress_bytes_parallel, decompress_points_parallel, update_points_parallel
+from points import G1Points, G2Points
 from srs_updates import UpdateProof, UpdateProofs
 
 
 G1Powers = List[hex_str]
 G2Powers = List[hex_str]
 
+# The batched structure check combines all of the pairing equations
+# using random scalars of this size. An SRS with the wrong structure
+# will pass the batched check with probability at most 2^-128
+STRUCTURE_CHECK_SCALAR_BITS = 128
+
 
 @dataclass
 class SerialisedSRS:
@@ -22,6 +32,71 @@ class SerialisedSRS:
     g1_points: G1Powers
     g2_points: G2Powers
 
+    # How the points are encoded, see `bls.COMPRESSED` and `bls.UNCOMPRESSED`.
+    # The published transcript is always compressed. Uncompressed points are twice
+    # the size but do not need a square root to deserialise, which suits internal hops
+    # such as sending the SRS to a verification worker or writing a checkpoint.
+    encoding: str = COMPRESSED
+
+    # Returns True if this is exactly what `SRS.serialise` would produce for the points it holds:
+    # compressed points, each as a lowercase hex string prepended by `0x`, with the flags
+    # and the range of x checked as in `bls.is_canonical_compressed_g1`.
+    # The decoder accepts other encodings of the same point, so without these checks
+    # an SRS that deserialises successfully could still differ from `SRS.serialise`.
+    # Such an SRS can be passed on as it is, once it has been deserialised successfully.
+    def is_canonical(self) -> bool:
+        if self.encoding != COMPRESSED:
+            return False
+        if len(self.g1_points) != self.num_g1_points or len(self.g2_points) != self.num_g2_points:
+            return False
+        for (powers, size, is_canonical_point) in [(self.g1_points, 48, is_canonical_compressed_g1), (self.g2_points, 96, is_canonical_compressed_g2)]:
+            for power in powers:
+                if isinstance(power, str) == False or len(power) != 2 + 2 * size or power.startswith("0x") == False or power != power.lower():
+                    return False
+                try:
+                    if is_canonical_point(bytes_from_hex(power)) == False:
+                        return False
+                except ValueError:
+                    # Not a hex string
+                    return False
+        return True
+
+    # The hex strings are immutable, so only the lists are copied
+    def copy(self) -> SerialisedSRS:
+        return SerialisedSRS(self.num_g1_points, self.num_g2_points, list(self.g1_points), list(self.g2_points), self.encoding)
+
+
+# The stages of `SRS.verify_updates_staged`, from the cheapest to the most expensive.
+# The stages before `STAGE_DESERIALISE` deserialise at most three points.
+STAGE_SIZES = "sizes"
+STAGE_ENCODING = "encoding"
+STAGE_DEGREE_0 = "degree-0 points"
+STAGE_PROOF_POINTS = "proof points"
+STAGE_DEGREE_1 = "degree-1 point"
+STAGE_UPDATE_PROOFS = "update proofs"
+STAGE_DESERIALISE = "deserialise"
+STAGE_SUBGROUP = "subgroup checks"
+STAGE_STRUCTURE = "structure check"
+
+VERIFICATION_STAGES = [STAGE_SIZES, STAGE_ENCODING, STAGE_DEGREE_0, STAGE_PROOF_POINTS, STAGE_DEGREE_1,
+                       STAGE_UPDATE_PROOFS, STAGE_DESERIALISE, STAGE_SUBGROUP, STAGE_STRUCTURE]
+
+# The stages that are cheap enough to run before accepting a contribution optimistically.
+# They do not check that the SRS is correct.
+OPTIMISTIC_VERIFICATION_STAGES = VERIFICATION_STAGES[:VERIFICATION_STAGES.index(
+    STAGE_DESERIALISE)]
+
+
+@dataclass
+class VerificationReport:
+    passed: bool
+    # The stage that rejected the SRS, if any
+    rejected_stage: Optional[str]
+    # The seconds taken by each stage that ran, in order
+    stage_times: List[Tuple[str, float]]
+    # The deserialised SRS, if it was deserialised and passed every stage
+    srs: Optional[SRS] = None
+
 
 @dataclass
 class SRSParameters:
@@ -43,13 +118,97 @@ class SRSParameters:
     starting_g2: G2Point = G2Generator
 
 
+# Updates a stream of serialised G1 or G2 powers one chunk at a time,
+# without deserialising the whole SRS. The i'th point in the stream is
+# multiplied by the i'th power of the private key.
+#
+# If `subgroup_check` is True, the points received are checked to be in the
+# correct subgroup while they are decompressed. The first window with a point outside of
+# the subgroup raises a ValueError before any of its points are updated, see `failing_index`,
+# and so does every window after it.
+#
+# `bls.multiply_g1` uses the GLV method, which is only correct for points in the subgroup,
+# so the G1 points are multiplied with `bls.multiply_wnaf` when the checks are turned off.
+class StreamingUpdate:
+    def __init__(self, private_key: PrivateKey, is_g2: bool = False, subgroup_check: bool = True):
+        self.private_key = private_key
+        self.is_g2 = is_g2
+        self.subgroup_check = subgroup_check
+        # The number of points that have been updated so far
+        self.num_points = 0
+        # The degree-1 point after the update, once it has been seen
+        self.degree_1_point = None
+        # The index of a received point that is not in the correct subgroup, if any
+        self.failing_index = None
+        self.__next_power = 1
+
+    # The powers are expected to be compressed, as in the published transcript
+    def update(self, powers: List[hex_str]) -> List[hex_str]:
+        if self.failing_index is not None:
+            raise ValueError("A previous window was not in the subgroup")
+
+        if self.is_g2:
+            points = [hex_str_to_g2(power, subgroup_check=False)
+                      for power in powers]
+        else:
+            points = [hex_str_to_g1(power, subgroup_check=False)
+                      for power in powers]
+
+        # The subgroup checks are done on the points we received, before they are updated
+        if self.subgroup_check and len(points) > 0:
+            result = batch_is_in_subgroup(points)
+            if result.passed == False:
+                self.failing_index = self.num_points + result.failing_index
+                raise ValueError("The given point is not in the %s subgroup" %
+                                 ("G2" if self.is_g2 else "G1"))
+
+        for i in range(len(points)):
+            # Same edge case as `PrivateKey.pow_i`
+            if self.private_key.scalar == 0:
+                scalar = 0
+            else:
+                scalar = self.__next_power
+
+            if self.is_g2:
+                points[i] = multiply_g2_scalar(points[i], scalar)
+            elif self.subgroup_check:
+                points[i] = multiply_g1_scalar(points[i], scalar)
+            else:
+                points[i] = multiply_wnaf(points[i], scalar)
+
+            if self.num_points == 1:
+                self.degree_1_point = points[i]
+
+            self.num_points += 1
+            self.__next_power = (self.__next_power *
+                                 self.private_key.scalar) % curve_order
+
+        if self.is_g2:
+            return g2_points_to_hex_strs(points)
+        return g1_points_to_hex_strs(points)
+
+
+# Unpacks the points into a list, checking that each point is on the curve as it is unpacked.
+# Returns None if a point is not on the curve.
+def _unpack_points_on_curve(points: Iterable, is_on_curve) -> Optional[list]:
+    unpacked = []
+    for point in points:
+        if is_on_curve(point) == False:
+            return None
+        unpacked.append(point)
+    return unpacked
+
+
 # The SRS also known as an accumulator, is that gets passed and modified between each participant
-# We serialise it in compressed form because we care more about the size of the file,
-# than the time to decompress the compressed form.
+# We serialise it in compressed form by default because we care more about the size of the file,
+# than the time to decompress the compressed form. See `SerialisedSRS.encoding`
+#
+# The points are held in packed containers rather than lists of tuples, see `points.py`.
+# They are unpacked into lists before being handed to the batched operations in `bls.py`.
 @dataclass
 class SRS:
-    g1_points: List[G1Point]
-    g2_points: List[G2Point]
+    g1_points: G1Points
+    g2_points: G2Points
 
     def __init__(self, param: SRSParameters, _g1_points=None, _g2_points=None):
         if _g1_points is None:
@@ -57,15 +216,17 @@ class SRS:
             assert _g2_points is None
             # g1_points becomes a list of size `num_g1_points_needed` where each element
             # is the same `starting_g1`
-            self.g1_points = [param.starting_g1] * param.num_g1_points_needed
-            self.g2_points = [param.starting_g2] * param.num_g2_points_needed
+            self.g1_points = G1Points.repeat(
+                param.starting_g1, param.num_g1_points_needed)
+            self.g2_points = G2Points.repeat(
+                param.starting_g2, param.num_g2_points_needed)
         else:
             assert len(_g1_points) == param.num_g1_points_needed
             assert len(_g2_points) == param.num_g2_points_needed
 
             # Initialise the SRS from the provided g1 ad g2 points
-            self.g1_points = _g1_points
-            self.g2_points = _g2_points
+            self.g1_points = G1Points(_g1_points)
+            self.g2_points = G2Points(_g2_points)
 
     def num_g1_points(self):
         return len(self.g1_points)
@@ -74,56 +235,82 @@ class SRS:
         return len(self.g2_points)
 
     # Update the SRS using a private key and produce an update proof
-    def update(self, keypair: KeyPair):
+    #
+    # If `num_workers` is larger than one, or an `executor` is given, the points are updated
+    # on a pool of worker processes, see `parallel.py`. The updated SRS is the same either way.
+    def update(self, keypair: KeyPair, num_workers: int = 1, executor: Optional[Executor] = None):
         num_g1_points = len(self.g1_points)
         num_g2_points = len(self.g2_points)
 
         private_key = keypair.private_key
 
-        for i in range(num_g1_points):
-            priv_key_i = private_key.pow_i(i)
-            self.g1_points[i] = multiply_g1(self.g1_points[i], priv_key_i)
+        # The powers of the private key are computed once and
+        # shared between the G1 and G2 points
+        powers = private_key.powers(max(num_g1_points, num_g2_points))
 
-        for i in range(num_g2_points):
-            priv_key_i = private_key.pow_i(i)
-            self.g2_points[i] = multiply_g2(self.g2_points[i], priv_key_i)
+        if num_workers > 1 or executor is not None:
+            g1_points, g2_points = update_points_parallel(
+                self.g1_points, self.g2_points, powers, num_workers, executor)
+            self.g1_points[:] = g1_points
+            self.g2_points[:] = g2_points
+        else:
+            for i in range(num_g1_points):
+                self.g1_points[i] = multiply_g1_scalar(
+                    self.g1_points[i], powers[i])
+
+            for i in range(num_g2_points):
+                self.g2_points[i] = multiply_g2_scalar(
+                    self.g2_points[i], powers[i])
 
         after_degree_1_point = self.__degree_1_g1()
 
         return UpdateProof(keypair.public_key, after_degree_1_point)
 
-    # Returns the G1 degree 0 element of the SRS
+    # Returns the G1 degree 0 element of the SRS.
+    # Reading a packed point always returns a new tuple, so it does not need to be copied
     def __degree_0_g1(self):
-        return deepcopy(self.g1_points[0])
+        return self.g1_points[0]
 
     # Returns the G1 degree 1 element of the SRS
     def __degree_1_g1(self):
-        return deepcopy(self.g1_points[1])
+        return self.g1_points[1]
 
     # Returns the G2 degree 0 element of the SRS
     def __degree_0_g2(self):
-        return deepcopy(self.g2_points[0])
+        return self.g2_points[0]
 
     # Returns the G2 degree 1 element of the SRS
     def __degree_1_g2(self):
-        return deepcopy(self.g2_points[1])
+        return self.g2_points[1]
 
+    # The copy shares the packed points with this SRS, and each chunk of points
+    # is only duplicated when either SRS writes to it, see `points.PackedPoints`
     def copy(self):
-        return deepcopy(self)
-
-    def __from_hex_strings(param: SRSParameters, serialised_srs: Tuple[G1Powers, G2Powers]) -> SRS:
-        g1_points = []
-        g2_points = []
+        param = SRSParameters(self.num_g1_points(), self.num_g2_points())
+        return SRS(param, self.g1_points.copy(), self.g2_points.copy())
 
+    def __from_hex_strings(param: SRSParameters, serialised_srs: Tuple[G1Powers, G2Powers], num_workers: int = 1, encoding: str = COMPRESSED, executor: Optional[Executor] = None) -> SRS:
         g1_powers, g2_powers = serialised_srs
 
-        for i in range(param.num_g1_points_needed):
-            point = hex_str_to_g1(g1_powers[i])
-            g1_points.append(point)
+        # Deserialisation checks that the points are on the curve.
+        # The subgroup checks are done on the whole SRS at once, see `subgroup_checks`
+        if num_workers > 1 or executor is not None:
+            g1_points, g2_points = decompress_points_parallel(
+                g1_powers[:param.num_g1_points_needed], g2_powers[:param.num_g2_points_needed], num_workers, encoding, executor)
+        else:
+            # The points are packed as they are deserialised, so the list of tuples is never built
+            g1_points = G1Points()
+            g2_points = G2Points()
+
+            for i in range(param.num_g1_points_needed):
+                point = hex_str_to_g1(
+                    g1_powers[i], subgroup_check=False, encoding=encoding)
+                g1_points.append(point)
 
-        for i in range(param.num_g2_points_needed):
-            point = hex_str_to_g2(g2_powers[i])
-            g2_points.append(point)
+            for i in range(param.num_g2_points_needed):
+                point = hex_str_to_g2(
+                    g2_powers[i], subgroup_check=False, encoding=encoding)
+                g2_points.append(point)
 
         # Check that we were given the exact amount of powers needed
         # This is placed to catch bugs, where the serialised_srs
@@ -133,31 +320,54 @@ class SRS:
 
         return SRS(param, g1_points, g2_points)
 
-    def __to_hex_strings(self) -> Tuple[G1Powers, G2Powers]:
-        g1_powers = []
-        g2_powers = []
-
-        for point in self.g1_points:
-            g1_powers.append(g1_to_hex_str(point))
-        for point in self.g2_points:
-            g2_powers.append(g2_to_hex_str(point))
+    def __to_hex_strings(self, encoding: str = COMPRESSED) -> Tuple[G1Powers, G2Powers]:
+        # The points are normalised in a batch, so that we only
+        # need one field inversion for each group
+        g1_powers = g1_points_to_hex_strs(list(self.g1_points), encoding)
+        g2_powers = g2_points_to_hex_strs(list(self.g2_points), encoding)
 
         return [g1_powers, g2_powers]
 
-    def serialise(self) -> SerialisedSRS:
+    def serialise(self, encoding: str = COMPRESSED) -> SerialisedSRS:
+        assert encoding == COMPRESSED or encoding == UNCOMPRESSED
         num_g1_points = self.num_g1_points()
         num_g2_points = self.num_g2_points()
-        g1_powers, g2_powers = self.__to_hex_strings()
+        g1_powers, g2_powers = self.__to_hex_strings(encoding)
 
-        return SerialisedSRS(num_g1_points, num_g2_points, g1_powers, g2_powers)
+        return SerialisedSRS(num_g1_points, num_g2_points, g1_powers, g2_powers, encoding)
 
-    def deserialise(param: SRSParameters, serialised_srs: SerialisedSRS):
+    # If `num_workers` is larger than one, or an `executor` is given,
+    # the points are decompressed on a pool of worker processes.
+    def deserialise(param: SRSParameters, serialised_srs: SerialisedSRS, num_workers: int = 1, executor: Optional[Executor] = None):
         if param.num_g1_points_needed != serialised_srs.num_g1_points:
             return None
         if param.num_g2_points_needed != serialised_srs.num_g2_points:
             return None
+        if serialised_srs.encoding != COMPRESSED and serialised_srs.encoding != UNCOMPRESSED:
+            return None
         powers = [serialised_srs.g1_points, serialised_srs.g2_points]
-        return SRS.__from_hex_strings(param, powers)
+        return SRS.__from_hex_strings(param, powers, num_workers, serialised_srs.encoding, executor)
+
+    # Deserialises an SRS from compressed points that are stored back to back,
+    # such as the memoryviews handed out by `binary_transcript.BinaryTranscript`.
+    # This avoids creating a hex string for each point.
+    def from_compressed_bytes(param: SRSParameters, g1_bytes: bytes, g2_bytes: bytes, num_workers: int = 1, executor: Optional[Executor] = None):
+        if len(g1_bytes) != param.num_g1_points_needed * 48:
+            return None
+        if len(g2_bytes) != param.num_g2_points_needed * 96:
+            return None
+
+        # As in `deserialise`, the subgroup checks are done on the whole SRS at once
+        if num_workers > 1 or executor is not None:
+            g1_points, g2_points = decompress_bytes_parallel(
+                g1_bytes, g2_bytes, num_workers, executor)
+        else:
+            g1_points = G1Points(compressed_bytes_to_g1(g1_bytes[i: i + 48], subgroup_check=False)
+                                 for i in range(0, len(g1_bytes), 48))
+            g2_points = G2Points(compressed_bytes_to_g2(g2_bytes[i: i + 96], subgroup_check=False)
+                                 for i in range(0, len(g2_bytes), 96))
+
+        return SRS(param, g1_points, g2_points)
 
     # Check if the SRS passes our correctness checks:
     # - The first element should not be the identity point
@@ -191,30 +401,139 @@ class SRS:
         # 1) First lets check that the last SRS is linked with the last update proof
         last_update = update_proofs[-1]
 
-        if g1_eq(after_srs.__degree_1_g1(), last_update.after_degree_1_point) == False:
-            return False
+        with span("verify.degree_1"):
+            if g1_eq(after_srs.__degree_1_g1(), last_update.after_degree_1_point) == False:
+                return False
 
         # 2) Check that the update proofs are correctly linked together
-        if UpdateProof.verify_chain(before_srs.__degree_1_g1(), update_proofs) == False:
-            return False
+        with span("verify.update_proofs"):
+            if UpdateProof.verify_chain(before_srs.__degree_1_g1(), update_proofs) == False:
+                return False
 
         # 3) Check that the final SRS is correct.
-        if after_srs.is_correct() == False:
-            return False
+        with span("verify.is_correct"):
+            if after_srs.is_correct() == False:
+                return False
 
         # Note: We do not check that `before_srs` was correct
         # This is because if `before_srs` is not correctly formed.
         # Then `after_srs` will also not be correct.
         return True
 
+    # Verifies a serialised SRS against the degree-1 point of the SRS it was updated from,
+    # running the checks in `stages` from the cheapest to the most expensive.
+    # The SRS is only deserialised once the checks that need a handful of points have passed,
+    # so that an upload which is obviously wrong is rejected without decompressing it.
+    #
+    # With every stage, this makes the same checks as `verify_updates`.
+    def verify_updates_staged(param: SRSParameters, before_degree_1_point: G1Point, serialised_srs: SerialisedSRS, update_proofs: UpdateProofs, stages: List[str] = VERIFICATION_STAGES, num_workers: int = 1, executor: Optional[Executor] = None) -> VerificationReport:
+        report = VerificationReport(True, None, [])
+
+        def check_sizes():
+            if serialised_srs.encoding != COMPRESSED and serialised_srs.encoding != UNCOMPRESSED:
+                return False
+            if serialised_srs.num_g1_points != param.num_g1_points_needed or len(serialised_srs.g1_points) != param.num_g1_points_needed:
+                return False
+            return serialised_srs.num_g2_points == param.num_g2_points_needed and len(serialised_srs.g2_points) == param.num_g2_points_needed
+
+        # Compressed points must also be the single encoding that `SRS.serialise` produces,
+        # since an optimistic coordinator passes them on before they are deserialised.
+        # Uncompressed points are checked as strictly when they are deserialised.
+        def check_encoding():
+            # Two hex characters per byte, see `bls.compressed_g1_to_bytes` and `bls.g1_to_bytes_uncompressed`
+            g1_size = 96 if serialised_srs.encoding == COMPRESSED else 192
+            for (powers, size, is_canonical_point) in [(serialised_srs.g1_points, g1_size, is_canonical_compressed_g1), (serialised_srs.g2_points, 2 * g1_size, is_canonical_compressed_g2)]:
+                for power in powers:
+                    if isinstance(power, str) == False:
+                        return False
+                    digits = power[2:] if power.startswith("0x") else power
+                    if len(digits) != size:
+                        return False
+                    # Raises a ValueError if the digits are not hex
+                    if serialised_srs.encoding == COMPRESSED and is_canonical_point(bytes.fromhex(digits)) == False:
+                        return False
+            return True
+
+        def check_degree_0():
+            g1_point = hex_str_to_g1(serialised_srs.g1_points[0],
+                                     encoding=serialised_srs.encoding)
+            g2_point = hex_str_to_g2(serialised_srs.g2_points[0],
+                                     encoding=serialised_srs.encoding)
+            return is_identity(g1_point) == False and is_identity(g2_point) == False
+
+        # The update proofs come from the participant, like the SRS
+        def check_proof_points():
+            if len(update_proofs) == 0:
+                return False
+            return all(isinstance(proof, UpdateProof) and proof.points_are_valid() for proof in update_proofs)
+
+        def check_degree_1():
+            point = hex_str_to_g1(serialised_srs.g1_points[1],
+                                  encoding=serialised_srs.encoding)
+            if is_identity(point):
+                return False
+            return g1_eq(point, update_proofs[-1].after_degree_1_point)
+
+        def check_update_proofs():
+            return UpdateProof.verify_chain(before_degree_1_point, update_proofs)
+
+        def deserialise():
+            report.srs = SRS.deserialise(
+                param, serialised_srs, num_workers, executor)
+            return report.srs is not None
+
+        checks = {
+            STAGE_SIZES: check_sizes,
+            STAGE_ENCODING: check_encoding,
+            STAGE_DEGREE_0: check_degree_0,
+            STAGE_PROOF_POINTS: check_proof_points,
+            STAGE_DEGREE_1: check_degree_1,
+            STAGE_UPDATE_PROOFS: check_update_proofs,
+            STAGE_DESERIALISE: deserialise,
+            STAGE_SUBGROUP: lambda: report.srs.subgroup_checks(),
+            STAGE_STRUCTURE: lambda: report.srs.structure_check(),
+        }
+
+        for stage in VERIFICATION_STAGES:
+            if stage not in stages:
+                continue
+            # The last two stages need the deserialised SRS
+            assert report.srs is not None or stage != STAGE_SUBGROUP and stage != STAGE_STRUCTURE
+
+            start = perf_counter()
+            try:
+                with span("verify." + stage):
+                    passed = checks[stage]()
+            except ValueError:
+                # The points could not be deserialised
+                passed = False
+            report.stage_times.append((stage, perf_counter() - start))
+
+            if passed == False:
+                report.passed = False
+                report.rejected_stage = stage
+                report.srs = None
+                break
+
+        return report
+
     # Check that each subsequent element of the SRS increases the degree by 1
     # ie the SRS has the correct structure
-    def structure_check(self):
+    #
+    # By default the pairing equations are batched together using a random linear combination.
+    # Setting `batched` to False will check each pair of powers individually.
+    def structure_check(self, batched: bool = True):
+        if batched:
+            return self.__structure_check_batched()
+        return self.__structure_check_exhaustive()
+
+    def __structure_check_exhaustive(self):
         tau_0_g1 = self.__degree_0_g1()
         tau_1_g1 = self.__degree_1_g1()
 
-        tau_0_g2 = self.__degree_0_g2()
-        tau_1_g2 = self.__degree_1_g2()
+        # These are paired with every G1 power, so their Miller loop lines are computed once
+        tau_0_g2 = PreparedG2(self.__degree_0_g2())
+        tau_1_g2 = PreparedG2(self.__degree_1_g2())
 
         # G1 structure check
         power_pairs = pairwise(self.g1_points)
@@ -222,10 +541,8 @@ class SRS:
             tau_i = pair[0]  # tau^i
             tau_i_next = pair[1]  # tau^{i+1}
 
-            p1 = pairing(tau_i_next, tau_0_g2)
-            p2 = pairing(tau_i, tau_1_g2)
-
-            if gt_eq(p1, p2) == False:
+            # e(tau^{i+1}, tau^0) == e(tau^i, tau^1)
+            if pairing_check([(tau_i_next, tau_0_g2), (neg_g1(tau_i), tau_1_g2)]) == False:
                 return False
 
         # G2 structure check
@@ -234,24 +551,85 @@ class SRS:
             tau_i = pair[0]  # tau^i
             tau_i_next = pair[1]  # tau^{i+1}
 
-            p1 = pairing(tau_0_g1, tau_i_next)
-            p2 = pairing(tau_1_g1, tau_i)
-
-            if gt_eq(p1, p2) == False:
+            # e(tau^0, tau^{i+1}) == e(tau^1, tau^i)
+            if pairing_check([(tau_0_g1, tau_i_next), (neg_g1(tau_1_g1), tau_i)]) == False:
                 return False
 
         return True
 
-    def subgroup_checks(self):
-        for point in self.g1_points:
-            if is_in_g1(point) == False:
+    # Instead of checking e(tau^{i+1}, tau^0) == e(tau^i, tau^1) for each i,
+    # we sample random scalars r_i and check that:
+    # e(sum r_i * tau^{i+1}, tau^0) == e(sum r_i * tau^i, tau^1)
+    #
+    # The sums are computed with a multi-scalar multiplication, so the whole
+    # check costs two pairing checks per SRS, instead of two per power.
+    #
+    # Note: This assumes that the points are in the correct subgroup.
+    def __structure_check_batched(self):
+        tau_0_g1 = self.__degree_0_g1()
+        tau_1_g1 = self.__degree_1_g1()
+
+        tau_0_g2 = self.__degree_0_g2()
+        tau_1_g2 = self.__degree_1_g2()
+
+        # G1 structure check
+        num_pairs = self.num_g1_points() - 1
+        if num_pairs > 0:
+            scalars = [randbits(STRUCTURE_CHECK_SCALAR_BITS)
+                       for _ in range(num_pairs)]
+            tau_i = lincomb(self.g1_points[:-1], scalars)
+            tau_i_next = lincomb(self.g1_points[1:], scalars)
+
+            # e(tau^{i+1}, tau^0) == e(tau^i, tau^1)
+            if pairing_check([(tau_i_next, tau_0_g2), (neg_g1(tau_i), tau_1_g2)]) == False:
                 return False
-            if is_in_subgroup(point) == False:
+
+        # G2 structure check
+        num_pairs = self.num_g2_points() - 1
+        if num_pairs > 0:
+            scalars = [randbits(STRUCTURE_CHECK_SCALAR_BITS)
+                       for _ in range(num_pairs)]
+            tau_i = lincomb(self.g2_points[:-1], scalars)
+            tau_i_next = lincomb(self.g2_points[1:], scalars)
+
+            # e(tau^0, tau^{i+1}) == e(tau^1, tau^i)
+            if pairing_check([(tau_0_g1, tau_i_next), (neg_g1(tau_1_g1), tau_i)]) == False:
                 return False
-        for point in self.g2_points:
-            if is_in_g2(point) == False:
+
+        return True
+
+    # Check that each element is on the curve and in the correct subgroup
+    #
+    # By default the subgroup checks are batched, see `batch_subgroup_checks`.
+    # Setting `batched` to False will check each point individually.
+    def subgroup_checks(self, batched: bool = True):
+        # Reading a packed point unpacks it, so each point is unpacked once
+        # and checked to be on the curve in the same pass
+        g1_points = _unpack_points_on_curve(self.g1_points, is_in_g1)
+        if g1_points is None:
+            return False
+        g2_points = _unpack_points_on_curve(self.g2_points, is_in_g2)
+        if g2_points is None:
+            return False
+
+        if batched:
+            return batch_is_in_subgroup(g1_points).passed and batch_is_in_subgroup(g2_points).passed
+
+        for point in g1_points:
+            if is_in_subgroup(point) == False:
                 return False
+        for point in g2_points:
             if is_in_subgroup(point) == False:
                 return False
 
         return True
+
+    # Checks that the G1 points and the G2 points are in the correct subgroup.
+    # Each result reports the soundness of the check, and the index of the
+    # offending point if it failed.
+    #
+    # Note: This assumes that the points are on the curve.
+    def batch_subgroup_checks(self) -> Tuple[SubgroupCheckResult, SubgroupCheckResult]:
+        g1_result = batch_is_in_subgroup(list(self.g1_points))
+        g2_result = batch_is_in_subgroup(list(self.g2_points))
+        return (g1_result, g2_result)
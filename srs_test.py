@@ -1,7 +1,8 @@
 import unittest
-from bls import is_identity, compressed_g1_to_bytes, compressed_g2_to_bytes, G1Generator
+from concurrent.futures import ProcessPoolExecutor
+from bls import FQ, PrivateKey, UNCOMPRESSED, g1_to_hex_str, hex_str_to_g1, multiply_wnaf, g1_eq, is_identity, compressed_g1_to_bytes, compressed_g2_to_bytes, G1Generator
 from keypair import KeyPair
-from srs import SRS, SRSParameters
+from srs import (StreamingUpdate, OPTIMISTIC_VERIFICATION_STAGES, STAGE_DEGREE_1, STAGE_DESERIALISE, STAGE_ENCODING, STAGE_SIZES, STAGE_STRUCTURE, VERIFICATION_STAGES, SRS, SRSParameters)
 
 
 class TestSRS(unittest.TestCase):
@@ -85,6 +86,161 @@ class TestSRS(unittest.TestCase):
             self.assertEqual(compressed_g2_to_bytes(point),
                              compressed_g2_to_bytes(des_point))
 
+    def test_uncompressed_serialisation_consistency(self):
+        """
+            Checks that an SRS serialised with uncompressed points carries its encoding
+            and deserialises to the same SRS as the compressed form
+        """
+        params = SRSParameters(3, 2)
+
+        srs = SRS(params)
+        srs.update(KeyPair(2))
+
+        serialised_srs = srs.serialise(UNCOMPRESSED)
+        self.assertEqual(serialised_srs.encoding, UNCOMPRESSED)
+
+        deserialised_srs = SRS.deserialise(params, serialised_srs)
+        self.assertEqual(deserialised_srs.serialise(), srs.serialise())
+        self.assertEqual(deserialised_srs.serialise(UNCOMPRESSED), serialised_srs)
+
+    def test_staged_verification(self):
+        """
+            Checks that the staged verification accepts a correct update, and reports
+            the stage that rejects an incorrect one without running the later stages
+        """
+        params = SRSParameters(4, 2)
+        before_srs = SRS(params)
+        after_srs = SRS(params)
+        proof = after_srs.update(KeyPair(2))
+        before_degree_1_point = before_srs.g1_points[1]
+
+        report = SRS.verify_updates_staged(
+            params, before_degree_1_point, after_srs.serialise(), [proof])
+        self.assertTrue(report.passed)
+        self.assertEqual([stage for (stage, _) in report.stage_times], VERIFICATION_STAGES)
+        self.assertEqual(report.srs.serialise(), after_srs.serialise())
+
+        too_small = after_srs.serialise()
+        too_small.g1_points.pop()
+        report = SRS.verify_updates_staged(
+            params, before_degree_1_point, too_small, [proof])
+        self.assertEqual(report.rejected_stage, STAGE_SIZES)
+        self.assertEqual(len(report.stage_times), 1)
+
+        # The SRS is not deserialised when the degree-1 point does not match the update proof
+        report = SRS.verify_updates_staged(
+            params, before_degree_1_point, before_srs.serialise(), [proof])
+        self.assertEqual(report.rejected_stage, STAGE_DEGREE_1)
+        self.assertNotIn(STAGE_DESERIALISE, [stage for (stage, _) in report.stage_times])
+
+        tampered = after_srs.serialise()
+        tampered.g1_points[3] = g1_to_hex_str(G1Generator)
+        report = SRS.verify_updates_staged(
+            params, before_degree_1_point, tampered, [proof])
+        self.assertEqual(report.rejected_stage, STAGE_STRUCTURE)
+        self.assertIsNone(report.srs)
+
+        # Another encoding of a valid point is rejected by the stages that an optimistic coordinator runs
+        non_canonical = after_srs.serialise()
+        power = non_canonical.g2_points[1]
+        non_canonical.g2_points[1] = "0x%02x" % (
+            int(power[2:4], 16) & 0x7f) + power[4:]
+        report = SRS.verify_updates_staged(
+            params, before_degree_1_point, non_canonical, [proof], OPTIMISTIC_VERIFICATION_STAGES)
+        self.assertEqual(report.rejected_stage, STAGE_ENCODING)
+
+    def test_batched_structure_check(self):
+        """
+            Checks that the batched structure check agrees with the exhaustive
+            check on a correct SRS and rejects an SRS with the wrong structure
+        """
+        # Size of the setup
+        num_g1_elements_needed = 3
+        num_g2_elements_needed = 2
+
+        params = SRSParameters(num_g1_elements_needed, num_g2_elements_needed)
+
+        srs = SRS(params)
+
+        srs.update(KeyPair(2))
+
+        self.assertTrue(srs.structure_check(batched=False))
+        self.assertTrue(srs.structure_check(batched=True))
+
+        # Swapping two powers breaks the structure of the SRS
+        srs.g1_points[1], srs.g1_points[2] = srs.g1_points[2], srs.g1_points[1]
+        self.assertFalse(srs.structure_check(batched=True))
+
+    def test_parallel_update_matches_serial_update(self):
+        """
+            Checks that updating the SRS on a pool of workers
+            gives exactly the same SRS as updating it in process
+        """
+        params = SRSParameters(8, 3)
+
+        serial_srs = SRS(params)
+        parallel_srs = SRS(params)
+
+        serial_proof = serial_srs.update(KeyPair(123456))
+        parallel_proof = parallel_srs.update(KeyPair(123456), num_workers=2)
+
+        self.assertEqual(serial_srs.serialise(), parallel_srs.serialise())
+        self.assertEqual(serial_proof, parallel_proof)
+
+    def test_parallel_deserialisation_consistency(self):
+        """
+            Checks that deserialising the SRS on a pool of workers
+            gives the same SRS as deserialising it in process
+        """
+        params = SRSParameters(8, 3)
+
+        srs = SRS(params)
+        srs.update(KeyPair(2))
+        serialised_srs = srs.serialise()
+
+        serial_srs = SRS.deserialise(params, serialised_srs)
+        parallel_srs = SRS.deserialise(params, serialised_srs, num_workers=2)
+
+        self.assertEqual(serial_srs.g1_points, parallel_srs.g1_points)
+        self.assertEqual(serial_srs.g2_points, parallel_srs.g2_points)
+
+    def test_streaming_update_outside_subgroup(self):
+        """
+            Checks that a streaming update rejects a point outside of the subgroup by default,
+            and multiplies it correctly when the subgroup checks are turned off
+        """
+        low_order_point = (FQ(0), FQ(2), FQ(1))
+        powers = [g1_to_hex_str(G1Generator), g1_to_hex_str(low_order_point)]
+
+        with self.assertRaises(ValueError):
+            StreamingUpdate(PrivateKey(5)).update(powers)
+
+        updated = StreamingUpdate(PrivateKey(5), subgroup_check=False).update(powers)
+        self.assertTrue(g1_eq(hex_str_to_g1(updated[1], subgroup_check=False),
+                              multiply_wnaf(low_order_point, 5)))
+
+    def test_parallel_calls_share_an_executor(self):
+        """
+            Checks that a pool passed in by the caller is used for several SRS's
+            and is still running afterwards
+        """
+        params = SRSParameters(8, 3)
+        serial_srs = SRS(params)
+        serial_srs.update(KeyPair(2))
+
+        with ProcessPoolExecutor(2) as executor:
+            parallel_srs = SRS(params)
+            parallel_srs.update(KeyPair(2), num_workers=2, executor=executor)
+            self.assertEqual(serial_srs.serialise(),
+                             parallel_srs.serialise())
+
+            for _ in range(2):
+                deserialised_srs = SRS.deserialise(
+                    params, serial_srs.serialise(), num_workers=2, executor=executor)
+                self.assertEqual(deserialised_srs.serialise(),
+                                 serial_srs.serialise())
+            self.assertEqual(executor.submit(abs, -1).result(), 1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Optional
 
-from bls import G1Point, PublicKey
+from bls import FQ, FQ2, G1Point, PublicKey, compressed_g2_points_to_bytes, is_in_g1, is_in_g2, is_in_subgroup
 from product_decomposition import ProductDecompositionProof
 
+# A single link costs two pairings when it is checked on its own. The batched verification
+# costs one pairing per link plus one, along with the subgroup checks, so it is faster from two links.
+BATCH_VERIFICATION_MIN_PROOFS = 2
+
 
 @dataclass
 class UpdateProof:
@@ -16,8 +20,26 @@ class UpdateProof:
     # after the update was made
     after_degree_1_point: G1Point
 
+    # Checks that the points of an update proof received over the network are well formed:
+    # on the curve and in the correct subgroup. The pairing code asserts that its inputs are
+    # on the curve, so this should be checked before the proof is verified.
+    def points_are_valid(self) -> bool:
+        if isinstance(self.public_key, PublicKey) == False:
+            return False
+        for (point, field) in [(self.after_degree_1_point, FQ), (self.public_key.point, FQ2)]:
+            if isinstance(point, tuple) == False or len(point) != 3:
+                return False
+            if any(isinstance(coordinate, field) == False for coordinate in point):
+                return False
+        if is_in_g1(self.after_degree_1_point) == False or is_in_g2(self.public_key.point) == False:
+            return False
+        return is_in_subgroup(self.after_degree_1_point) and is_in_subgroup(self.public_key.point)
+
     # Verifies that a chain of update proofs are linked
     # using the product decomposition proof module
+    #
+    # Chains with at least `BATCH_VERIFICATION_MIN_PROOFS` proofs are verified with a single
+    # multi-pairing, see `ProductDecompositionProof.verify_batched`
     def verify_chain(starting_point: G1Point, proofs: List[UpdateProof]):
         assert(len(proofs) > 0)
 
@@ -27,7 +49,50 @@ class UpdateProof:
             product_proof.extend(proof.after_degree_1_point,
                                  proof.public_key.point)
 
+        if len(proofs) >= BATCH_VERIFICATION_MIN_PROOFS:
+            return product_proof.verify_batched()
         return product_proof.verify()
 
 
 UpdateProofs = List[UpdateProof]
+
+
+# Maps the compressed public key of each update proof to the position of the first
+# update proof with that public key, so that a contribution can be found without
+# comparing the public key against every update proof.
+#
+# A point has a single compressed encoding, so this finds the same position as
+# comparing the points with `g2_eq`.
+class UpdateProofIndex:
+    def __init__(self, proofs: Optional[UpdateProofs] = None):
+        self.positions: Dict[bytes, int] = {}
+        self.num_proofs = 0
+        if proofs is not None:
+            self.extend(proofs)
+
+    def append(self, proof: UpdateProof):
+        self.extend([proof])
+
+    def extend(self, proofs: UpdateProofs):
+        # The public keys are compressed with a single field inversion
+        keys = compressed_g2_points_to_bytes(
+            [proof.public_key.point for proof in proofs])
+        for key in keys:
+            self.positions.setdefault(key, self.num_proofs)
+            self.num_proofs += 1
+
+    # Forgets the update proofs from position `num_proofs` onwards
+    def truncate(self, num_proofs: int):
+        if num_proofs >= self.num_proofs:
+            return
+        self.positions = {key: position for (key, position) in self.positions.items()
+                          if position < num_proofs}
+        self.num_proofs = num_proofs
+
+    def find(self, key: PublicKey) -> Optional[int]:
+        return self.find_many([key])[0]
+
+    def find_many(self, keys: List[PublicKey]) -> List[Optional[int]]:
+        serialised_keys = compressed_g2_points_to_bytes(
+            [key.point for key in keys])
+        return [self.positions.get(key) for key in serialised_keys]
@@ -0,0 +1,243 @@
+import json
+import re
+from typing import Iterator, List, TextIO, Tuple, Union
+
+from common import hex_str
+
+# A streaming codec for the JSON encoding of a transcript:
+#
+#   {"sub_ceremonies": [{"num_g1_points": 4096, "num_g2_points": 65, "encoding": "compressed",
+#                        "g1_points": ["0x..", ...], "g2_points": ["0x..", ...]}, ...]}
+#
+# This is the encoding of `dataclasses.asdict(transcript)`.
+# The reader yields the points of each sub-ceremony in chunks as they are parsed,
+# and the writer writes them out as they are produced, so that the whole
+# transcript never needs to be in memory.
+
+# The number of points yielded at a time by the reader
+DEFAULT_CHUNK_SIZE = 1024
+
+# The number of characters read from the file at a time
+READ_SIZE = 1 << 16
+
+NUM_G1_POINTS = "num_g1_points"
+NUM_G2_POINTS = "num_g2_points"
+G1_POINTS = "g1_points"
+G2_POINTS = "g2_points"
+ENCODING = "encoding"
+
+# (sub-ceremony index, key, value)
+# For the number of points, the value is an integer and for the encoding it is a string.
+# For the points, the value is a chunk of the points and there
+# is one event per chunk.
+TranscriptEvent = Tuple[int, str, Union[int, str, List[hex_str]]]
+
+_TOKEN = re.compile(
+    r'\s*(?:([{}\[\]:,])|"((?:[^"\\]|\\.)*)"|(-?\d+)|(true|false|null))')
+_STRING = 2
+_NUMBER = 3
+
+
+def _tokens(file: TextIO) -> Iterator[Tuple[int, str]]:
+    buffer = ""
+    position = 0
+    end_of_file = False
+
+    while True:
+        match = _TOKEN.match(buffer, position)
+        # A token that runs to the end of the buffer may continue in the next read
+        if match is None or (match.end() == len(buffer) and not end_of_file):
+            if end_of_file:
+                if buffer[position:].strip():
+                    raise ValueError("invalid JSON in transcript")
+                return
+            data = file.read(READ_SIZE)
+            end_of_file = data == ""
+            buffer = buffer[position:] + data
+            position = 0
+            continue
+
+        position = match.end()
+        kind = match.lastindex
+        token = match.group(kind)
+        if kind == _STRING and "\\" in token:
+            token = json.loads('"' + token + '"')
+        yield (kind, token)
+
+
+class _Parser:
+    def __init__(self, file: TextIO):
+        self.tokens = _tokens(file)
+
+    def next(self) -> Tuple[int, str]:
+        try:
+            return next(self.tokens)
+        except StopIteration:
+            raise ValueError("unexpected end of transcript")
+
+    def expect(self, expected: str):
+        _, token = self.next()
+        if token != expected:
+            raise ValueError("expected %r in transcript, found %r" %
+                             (expected, token))
+
+    def integer(self) -> int:
+        kind, token = self.next()
+        if kind != _NUMBER:
+            raise ValueError(
+                "expected an integer in transcript, found %r" % token)
+        return int(token)
+
+    def string(self) -> str:
+        kind, token = self.next()
+        if kind != _STRING:
+            raise ValueError(
+                "expected a string in transcript, found %r" % token)
+        return token
+
+    # Yields each key of an object whose opening brace has been read.
+    # The caller parses the value before asking for the next key.
+    def keys(self) -> Iterator[str]:
+        kind, token = self.next()
+        if token == "}":
+            return
+        while True:
+            if kind != _STRING:
+                raise ValueError(
+                    "expected a key in transcript, found %r" % token)
+            self.expect(":")
+            yield token
+
+            _, token = self.next()
+            if token == "}":
+                return
+            if token != ",":
+                raise ValueError(
+                    "expected ',' or '}' in transcript, found %r" % token)
+            kind, token = self.next()
+
+    # Yields the first token of each element of an array whose opening bracket has been read.
+    # The caller parses the rest of the element before asking for the next one.
+    def elements(self) -> Iterator[Tuple[int, str]]:
+        kind, token = self.next()
+        if token == "]":
+            return
+        while True:
+            yield (kind, token)
+
+            _, token = self.next()
+            if token == "]":
+                return
+            if token != ",":
+                raise ValueError(
+                    "expected ',' or ']' in transcript, found %r" % token)
+            kind, token = self.next()
+
+
+def read_transcript_events(file: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[TranscriptEvent]:
+    parser = _Parser(file)
+
+    parser.expect("{")
+    for key in parser.keys():
+        if key != "sub_ceremonies":
+            raise ValueError("unexpected key %r in transcript" % key)
+
+        parser.expect("[")
+        for index, (_, token) in enumerate(parser.elements()):
+            if token != "{":
+                raise ValueError(
+                    "expected a sub-ceremony in transcript, found %r" % token)
+            yield from _read_sub_ceremony(parser, index, chunk_size)
+
+
+# Reads the keys of a sub-ceremony object, after its opening brace
+def _read_sub_ceremony(parser: _Parser, index: int, chunk_size: int) -> Iterator[TranscriptEvent]:
+    for key in parser.keys():
+        if key == NUM_G1_POINTS or key == NUM_G2_POINTS:
+            yield (index, key, parser.integer())
+        elif key == ENCODING:
+            yield (index, key, parser.string())
+        elif key == G1_POINTS or key == G2_POINTS:
+            parser.expect("[")
+            chunk = []
+            num_chunks = 0
+            for kind, point in parser.elements():
+                if kind != _STRING:
+                    raise ValueError(
+                        "expected a point in transcript, found %r" % point)
+                chunk.append(point)
+                if len(chunk) == chunk_size:
+                    yield (index, key, chunk)
+                    chunk = []
+                    num_chunks += 1
+            # An empty list of points is still reported
+            if len(chunk) > 0 or num_chunks == 0:
+                yield (index, key, chunk)
+        else:
+            raise ValueError("unexpected key %r in sub-ceremony" % key)
+
+
+# Writes a transcript one sub-ceremony, key and chunk of points at a time.
+# Keys are written in the order that they are given.
+class TranscriptWriter:
+    def __init__(self, file: TextIO):
+        self.file = file
+        self.num_ceremonies = 0
+        self.num_keys = 0
+        self.current_key = None
+        self.num_points = 0
+        self.file.write('{"sub_ceremonies": [')
+
+    def begin_sub_ceremony(self):
+        self.end_key()
+        if self.num_ceremonies > 0:
+            self.end_sub_ceremony()
+            self.file.write(", ")
+        self.file.write("{")
+        self.num_ceremonies += 1
+        self.num_keys = 0
+
+    def end_sub_ceremony(self):
+        self.file.write("}")
+
+    def write_integer(self, key: str, value: int):
+        self.end_key()
+        self.__write_key(key)
+        self.file.write(str(int(value)))
+
+    def write_string(self, key: str, value: str):
+        self.end_key()
+        self.__write_key(key)
+        self.file.write(json.dumps(value))
+
+    def write_points(self, key: str, points: List[hex_str]):
+        if self.current_key != key:
+            self.end_key()
+            self.__write_key(key)
+            self.file.write("[")
+            self.current_key = key
+            self.num_points = 0
+
+        for point in points:
+            if self.num_points > 0:
+                self.file.write(", ")
+            self.file.write(json.dumps(point))
+            self.num_points += 1
+
+    # Closes the list of points that is being written, if any
+    def end_key(self):
+        if self.current_key is not None:
+            self.file.write("]")
+            self.current_key = None
+
+    def close(self):
+        self.end_key()
+        if self.num_ceremonies > 0:
+            self.end_sub_ceremony()
+        self.file.write("]}")
+
+    def __write_key(self, key: str):
+        if self.num_keys > 0:
+            self.file.write(", ")
+        self.file.write(json.dumps(key) + ": ")
+        self.num_keys += 1
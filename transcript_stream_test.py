@@ -0,0 +1,96 @@
+import io
+import json
+import unittest
+from dataclasses import asdict
+from bls import FQ, g1_to_hex_str
+from keypair import KeyPair
+from sdk import Transcript, read_transcript_json, update_transcript_stream, write_transcript_json
+from srs import SRS, SRSParameters
+import transcript_stream
+
+
+def small_transcript(params):
+    sub_ceremonies = []
+    for i, param in enumerate(params):
+        srs = SRS(param)
+        srs.update(KeyPair(i + 2))
+        sub_ceremonies.append(srs.serialise())
+    return Transcript(sub_ceremonies)
+
+
+class TestTranscriptStream(unittest.TestCase):
+
+    def test_json_roundtrip(self):
+        """
+            Checks that the streaming writer produces the JSON encoding of the transcript
+            and that the streaming reader reads it back, even when a read
+            splits a token in half
+        """
+        params = [SRSParameters(4, 2), SRSParameters(3, 2)]
+        transcript = small_transcript(params)
+
+        file = io.StringIO()
+        write_transcript_json(transcript, file)
+        self.assertEqual(json.loads(file.getvalue()), asdict(transcript))
+
+        read_size = transcript_stream.READ_SIZE
+        transcript_stream.READ_SIZE = 7
+        try:
+            file.seek(0)
+            self.assertEqual(read_transcript_json(file), transcript)
+        finally:
+            transcript_stream.READ_SIZE = read_size
+
+    def test_streaming_update_matches_update(self):
+        """
+            Checks that updating a transcript chunk by chunk gives
+            the same transcript and update proofs as updating each SRS in memory
+        """
+        params = [SRSParameters(5, 3), SRSParameters(4, 2)]
+        transcript = small_transcript(params)
+        secrets = ["0x1234", "0x5678"]
+
+        input_file = io.StringIO()
+        write_transcript_json(transcript, input_file)
+        input_file.seek(0)
+        output_file = io.StringIO()
+        proofs = update_transcript_stream(
+            input_file, output_file, secrets, params, chunk_size=2)
+
+        output_file.seek(0)
+        updated_transcript = read_transcript_json(output_file)
+
+        for i, param in enumerate(params):
+            srs = SRS.deserialise(param, transcript.sub_ceremonies[i])
+            expected_proof = srs.update(KeyPair(secrets[i]))
+
+            self.assertEqual(
+                updated_transcript.sub_ceremonies[i], srs.serialise())
+            self.assertEqual(proofs[i], expected_proof)
+
+    def test_streaming_update_stops_at_subgroup_failure(self):
+        """
+            Checks that a point outside of the subgroup stops the update
+            before the window containing it is updated or written
+        """
+        params = [SRSParameters(5, 3)]
+        transcript = small_transcript(params)
+        low_order_point = g1_to_hex_str((FQ(0), FQ(2), FQ(1)))
+        transcript.sub_ceremonies[0].g1_points[3] = low_order_point
+
+        input_file = io.StringIO()
+        write_transcript_json(transcript, input_file)
+        input_file.seek(0)
+        output_file = io.StringIO()
+        with self.assertRaises(ValueError):
+            update_transcript_stream(
+                input_file, output_file, ["0x1234"], params, chunk_size=2)
+
+        output = output_file.getvalue()
+        self.assertEqual(output.count("0x"), 2)
+        with self.assertRaises(ValueError):
+            json.loads(output)
+
+
+if __name__ == '__main__':
+    unittest.main()